@@ -0,0 +1,272 @@
+"""
+Unified face analysis stage for the Safe Drive pipeline.
+
+Each frame is searched for a face exactly once. The resulting box is handed
+to the dlib landmark predictor (eye aspect ratio) and, as a crop, to the
+emotion classifier (see emotion.py), so neither model runs its own face
+detector.
+
+The two models run at different rates: landmarks and the eye aspect ratio
+on every analysed frame, so eye closures are timed precisely, and the far
+more expensive emotion classifier at most every emotion_interval seconds,
+with the most recent result reused in between.
+"""
+
+import time
+import cv2
+import numpy as np
+from typing import NamedTuple, Optional, Tuple
+from config import Config
+from logger import logger
+from utils import calculate_ear, rect_to_box, scale_rect, translate_rect
+from tracking import FaceTracker
+from emotion import CNNEmotionClassifier, EmotionBatcher, FERClassifier, NumpyEmotionCNN, load_keras_predict
+
+# Eye aspect ratio below which the eyes are considered closed
+EAR_THRESHOLD = 0.25
+
+
+class FaceAnalysis(NamedTuple):
+    """Result of analysing a single frame."""
+    box: Optional[Tuple[int, int, int, int]]
+    emotions: Optional[dict]
+    ear: Optional[float]
+
+    @property
+    def eyes_closed(self) -> bool:
+        """True if a face was found and its eye aspect ratio is below threshold."""
+        return self.ear is not None and self.ear < EAR_THRESHOLD
+
+
+NO_FACE = FaceAnalysis(box=None, emotions=None, ear=None)
+
+
+class FaceAnalyzer:
+    """Runs face detection once and shares the result between models."""
+
+    def __init__(self, detector, predictor, emotion_detector, tracker=None,
+                 detection_scale: float = 1.0, roi=None, emotion_interval: float = 0.0):
+        self.detector = detector
+        self.predictor = predictor
+        self.emotion_detector = emotion_detector
+        self.tracker = tracker
+        self.detection_scale = min(detection_scale, 1.0)
+        self.roi = roi
+        self.emotion_interval = max(emotion_interval, 0.0)
+        # Most recent successful emotion result and when it was classified
+        self.emotions = None
+        self.emotions_at = 0.0
+        self.emotion_runs = 0
+        self.emotion_reused = 0
+
+    def detect_face(self, gray: np.ndarray):
+        """
+        Detect the primary face in a grayscale frame.
+
+        When a driver ROI is calibrated the search runs inside it first and
+        falls back to the full frame if the face has left the region.
+
+        Args:
+            gray: Grayscale frame
+
+        Returns:
+            dlib rectangle of the first detected face, or None
+        """
+        roi = self.roi
+        # A region set before the first frame may reach past it
+        region = roi.fit(gray.shape) if roi is not None else None
+        if region is not None:
+            x, y, w, h = region
+            rect = self._detect(np.ascontiguousarray(gray[y:y + h, x:x + w]))
+            if rect is not None:
+                return translate_rect(rect, x, y)
+            roi.misses += 1
+
+        rect = self._detect(gray)
+        if rect is not None and roi is not None:
+            roi.observe(rect_to_box(rect, gray.shape), gray.shape)
+        return rect
+
+    def _detect(self, gray: np.ndarray):
+        """
+        Run the face detector, optionally on a downscaled copy.
+
+        Detection runs on a copy downscaled by detection_scale and the box is
+        mapped back, so landmarks and the emotion crop keep full resolution.
+        """
+        scale = self.detection_scale
+        if scale < 1.0:
+            small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            rects = self.detector(small, 0)
+            return scale_rect(rects[0], 1.0 / scale) if len(rects) > 0 else None
+
+        rects = self.detector(gray, 0)
+        return rects[0] if len(rects) > 0 else None
+
+    def locate_face(self, gray: np.ndarray):
+        """
+        Locate the primary face, using the tracker between full detections.
+
+        Args:
+            gray: Grayscale frame
+
+        Returns:
+            dlib rectangle of the face, or None
+        """
+        if self.tracker is None:
+            return self.detect_face(gray)
+        return self.tracker.locate(gray, self.detect_face)
+
+    def classify_emotions(self, frame: np.ndarray, box: Tuple[int, int, int, int]) -> Optional[dict]:
+        """
+        Classify emotions for a known face box without re-detecting.
+
+        Args:
+            frame: BGR frame
+            box: Face box as (x, y, width, height)
+
+        Returns:
+            Dictionary of emotion scores, or None if classification failed
+        """
+        if box[2] == 0 or box[3] == 0:
+            return None
+
+        return self.emotion_detector.classify(frame, box)
+
+    def latest_emotions(self, frame: np.ndarray, box: Tuple[int, int, int, int],
+                        now: Optional[float] = None) -> Optional[dict]:
+        """
+        Classify emotions when due, otherwise return the most recent result.
+
+        Args:
+            frame: BGR frame
+            box: Face box as (x, y, width, height)
+            now: Current time, defaults to time.time()
+
+        Returns:
+            Dictionary of emotion scores, or None if none has been classified yet
+        """
+        now = time.time() if now is None else now
+        if self.emotions is not None and now - self.emotions_at < self.emotion_interval:
+            self.emotion_reused += 1
+            return self.emotions
+
+        self.emotion_runs += 1
+        try:
+            emotions = self.classify_emotions(frame, box)
+        except Exception as e:
+            logger.warning(f"Emotion classification failed: {e}")
+            emotions = None
+        # A failed classification is retried on the next frame
+        if emotions is not None:
+            self.emotions, self.emotions_at = emotions, now
+        return self.emotions
+
+    def analyze(self, frame: np.ndarray) -> FaceAnalysis:
+        """
+        Detect the face once and run landmarks and, when due, emotion on it.
+
+        Args:
+            frame: BGR frame
+
+        Returns:
+            FaceAnalysis for the primary face, or NO_FACE
+        """
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        rect = self.locate_face(gray)
+        if rect is None:
+            # The next face may belong to someone else; classify it afresh
+            self.emotions = None
+            return NO_FACE
+
+        box = rect_to_box(rect, frame.shape)
+        ear = calculate_ear(gray, rect, self.predictor)
+        emotions = self.latest_emotions(frame, box)
+
+        return FaceAnalysis(box=box, emotions=emotions, ear=ear)
+
+
+def load_emotion_classifier():
+    """Build the emotion classifier selected by Config.EMOTION_BACKEND."""
+    if Config.EMOTION_BACKEND in ('cnn', 'numpy'):
+        if Config.EMOTION_BACKEND == 'numpy':
+            # Same trained network without importing TensorFlow
+            predict = NumpyEmotionCNN.load(Config.MODEL_PATH)
+        else:
+            predict = load_keras_predict(Config.MODEL_PATH)
+        batcher = EmotionBatcher(
+            predict,
+            max_batch=Config.EMOTION_BATCH_SIZE,
+            max_wait=Config.EMOTION_BATCH_WAIT_MS / 1000.0
+        )
+        return CNNEmotionClassifier(batcher)
+
+    try:
+        from fer import FER
+    except ImportError:
+        # Fallback for versions where FER is under fer.fer
+        try:
+            from fer.fer import FER
+        except Exception as e:
+            # If both imports fail, raise a clear error
+            raise ImportError("Failed to import FER from 'fer' library. Ensure compatible 'fer' is installed.") from e
+
+    # Faces are located once by dlib and the boxes are handed to FER,
+    # so FER's own (MTCNN) face detector is never needed.
+    return FERClassifier(FER())
+
+
+def load_models():
+    """
+    Load the emotion classifier, face detector and landmark predictor.
+
+    Returns:
+        Tuple of (emotion classifier, dlib face detector, dlib shape predictor)
+    """
+    import dlib
+
+    return (
+        load_emotion_classifier(),
+        dlib.get_frontal_face_detector(),
+        dlib.shape_predictor(Config.SHAPE_PREDICTOR_PATH)
+    )
+
+
+def create_analyzer(models, roi=None) -> FaceAnalyzer:
+    """
+    Build a per-stream analyzer around shared models, configured from Config.
+
+    Args:
+        models: Tuple returned by load_models()
+        roi: Optional DriverROI of the stream
+
+    Returns:
+        FaceAnalyzer with its own tracking state
+    """
+    emotion_detector, detector, predictor = models
+    tracker = None
+    if Config.FACE_TRACKING:
+        tracker = FaceTracker(Config.DETECTION_INTERVAL, Config.TRACKING_MIN_CONFIDENCE)
+    emotion_interval = 1.0 / Config.EMOTION_FPS if Config.EMOTION_FPS > 0 else 0.0
+    return FaceAnalyzer(detector, predictor, emotion_detector, tracker, Config.DETECTION_SCALE, roi, emotion_interval)
+
+
+def warm_up(models, frame_shape: Tuple[int, int, int] = (480, 640, 3)):
+    """
+    Run every model once on a dummy frame so the first real frame is not slow.
+
+    Args:
+        models: Tuple returned by load_models()
+        frame_shape: Shape of the dummy frame
+    """
+    import dlib
+
+    emotion_detector, detector, predictor = models
+    frame = np.random.default_rng(0).integers(0, 255, frame_shape, dtype=np.uint8)
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    height, width = gray.shape
+    rect = dlib.rectangle(width // 4, height // 4, 3 * width // 4, 3 * height // 4)
+
+    detector(gray, 0)
+    predictor(gray, rect)
+    emotion_detector.classify(frame, rect_to_box(rect, frame.shape))
@@ -1,31 +1,39 @@
+import atexit
 import cv2
+import json
+import os
 import time
-from flask import Flask, Response, jsonify
+import uuid
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 try:
-    from fer import FER
+    from flask_sock import Sock
 except ImportError:
-    # Fallback for versions where FER is under fer.fer
-    try:
-        from fer.fer import FER
-    except Exception as e:
-        # If both imports fail, raise a clear error
-        raise ImportError("Failed to import FER from 'fer' library. Ensure compatible 'fer' is installed.") from e
-
+    # The WebSocket channel is optional; HTTP endpoints work without it
+    Sock = None
 import numpy as np
 from config import Config
 from logger import logger
 from utils import (
     secure_camera_capture,
+    camera_backend,
     validate_frame,
     sanitize_emotion_label,
     calculate_sleep_probability,
-    detect_eye_closure,
     safe_release_resources
 )
-import dlib
+from analysis import create_analyzer, load_models, warm_up
+from capture import LatestFrameSlot
+from rate_control import AdaptiveRateController
+from roi import DriverROI, clamp_region, parse_roi
+from fleet import InferencePool, parse_fleet_streams
+from process_backend import ProcessInferenceBackend
+from frame_cache import FrameCache
+from frame_bus import mirror_from_bus, publish_to_bus
+from mjpeg import MJPEGStream, decode_jpeg
+from reconnect import Reconnector
+from motion import ChangeGate
 import threading
-import base64
 
 # Sleep status constants
 SLEEP_STATUS_ASLEEP = "Asleep"
@@ -45,10 +53,75 @@ CORS(app, resources={
     }
 })
 
+# Distinguishes sequence numbers of this process from those of earlier runs
+BOOT_ID = uuid.uuid4().hex[:8]
+
+_models = None
+_models_lock = threading.Lock()
+
+_process_backend = None
+
+# Model preload progress reported by /api/ready
+readiness = {'state': 'idle', 'progress': 0.0, 'error': None}
+
+def get_process_backend():
+    """Start the shared process inference backend on first use."""
+    global _process_backend
+    with _models_lock:
+        if _process_backend is None:
+            _process_backend = ProcessInferenceBackend(Config.INFERENCE_PROCESSES)
+            # Workers and shared memory blocks outlive the process otherwise
+            atexit.register(_process_backend.close)
+            if readiness['state'] == 'idle':
+                # Started on demand without preloading; report when the workers are up
+                _set_readiness('loading', 0.1)
+                threading.Thread(
+                    target=_await_process_backend, args=(_process_backend,), name="backend-ready", daemon=True
+                ).start()
+        return _process_backend
+
+def _await_process_backend(backend):
+    try:
+        backend.wait_ready()
+        _set_readiness('ready', 1.0)
+    except Exception as e:
+        _set_readiness('error', 0.0, str(e))
+
+def get_models():
+    """Load the emotion and face models once and share them between streams."""
+    global _models
+    with _models_lock:
+        if _models is None:
+            _models = load_models()
+            if readiness['state'] == 'idle':
+                # Loaded on demand without preloading; inference is available from now on
+                _set_readiness('ready', 1.0)
+        return _models
+
 class VideoStreamHandler:
     """Manages video streaming and driver status detection."""
     
-    def __init__(self):
+    def __init__(self, stream_id: str = 'default', source: str = None, standby: str = None):
+        self.stream_id = stream_id
+        if source is None:
+            standby = standby or Config.STANDBY_SOURCE or None
+            self.use_stream = Config.USE_STREAM
+            self.stream_url = Config.STREAM_URL
+            self.camera_index = Config.CAMERA_INDEX
+            self.camera_fallback_index = Config.CAMERA_FALLBACK_INDEX
+        elif source.isdigit():
+            self.use_stream = False
+            self.stream_url = None
+            self.camera_index = self.camera_fallback_index = int(source)
+        else:
+            self.use_stream = True
+            self.stream_url = source
+            self.camera_index = self.camera_fallback_index = None
+        # HTTP MJPEG sources can be ingested as raw JPEG and decoded only when analysed
+        self.passthrough = bool(
+            Config.MJPEG_PASSTHROUGH and self.use_stream
+            and self.stream_url.startswith(('http://', 'https://'))
+        )
         self.frame = None
         self.status_data = {
             'emotion': 'Unknown',
@@ -57,23 +130,92 @@ class VideoStreamHandler:
         }
         self.running = False
         self.cap = None
+        # Camera index or stream URL kept open while the primary source works
+        self.standby_source = standby
+        self.standby_cap = None
+        # "primary", "standby", or None while no source delivers frames
+        self.active_source = None
+        # Primary source reopened in the background, picked up by the capture loop
+        self.reconnected_cap = None
+        self.reconnects = 0
+        self.reconnector = Reconnector(
+            self._open_primary,
+            self._primary_reconnected,
+            initial_delay=Config.RECONNECT_INITIAL_DELAY,
+            max_delay=Config.RECONNECT_MAX_DELAY,
+            name=f"reconnect-{stream_id}"
+        )
+        # Standby reopened in the background after it failed, picked up by the capture loop
+        self.reconnected_standby = None
+        self.standby_reconnector = Reconnector(
+            self._open_standby,
+            self._standby_reconnected,
+            initial_delay=Config.RECONNECT_INITIAL_DELAY,
+            max_delay=Config.RECONNECT_MAX_DELAY,
+            name=f"reconnect-standby-{stream_id}"
+        )
+        # Grabs the idle standby's frames while the primary is active
+        self.standby_drain = None
+        self._standby_drain_stop = threading.Event()
         self.emotion_detector = None
         self.detector = None
         self.predictor = None
+        self.analyzer = None
+        self.process_backend = None
+        self.roi = None
+        if Config.DRIVER_ROI_ENABLED:
+            self.roi = DriverROI(
+                stream_id,
+                storage_dir=Config.ROI_DIR,
+                calibration_frames=Config.ROI_CALIBRATION_FRAMES,
+                region=parse_roi(Config.DRIVER_ROI)
+            )
+        self.change_gate = None
+        if Config.MOTION_GATE:
+            self.change_gate = ChangeGate(Config.MOTION_GATE_THRESHOLD, Config.MOTION_GATE_MAX_REUSE)
         self.eye_closed_start = None
         self.frame_count = 0
+        self.frames_processed = 0
+        self.frames_rate_limited = 0
+        self.frames_decoded = 0
+        self.rate_controller = None
+        self.last_latency = 0.0
+        self.frame_slot = None
+        self.capture_thread = None
         self.frame_lock = threading.Lock()
         self.status_lock = threading.Lock()
+        # Signalled whenever status_data changes; status_seq counts the changes
+        # within status_epoch (this boot, or the frame bus publisher's generation)
+        self.status_changed = threading.Condition(self.status_lock)
+        self.status_seq = 0
+        self.status_epoch = BOOT_ID
+        # Callables invoked after every status change, from the thread that made it;
+        # passthrough frames and source switches are not published together with a status
+        self.status_listeners = []
+        self.frame_cache = FrameCache(Config.JPEG_QUALITY)
+        self.bus_writer = None
+        # Set by the frame bus reader once the publisher's block has been read
+        self.bus_attached = False
     
-    def _initialize_stream(self):
-        """Initialize network stream capture."""
+    def _initialize_stream(self, url: str = None):
+        """Initialize network stream capture; url defaults to the primary stream."""
+        if url is None:
+            if self.passthrough:
+                return self._initialize_mjpeg()
+            url = self.stream_url
         try:
-            logger.info(f"Connecting to stream: {Config.STREAM_URL}")
-            cap = cv2.VideoCapture(Config.STREAM_URL)
+            logger.info(f"Connecting to stream: {url}")
+            # Bound the open and read calls so a dead host cannot stall the caller
+            timeout_ms = int(Config.STREAM_TIMEOUT * 1000)
+            cap = cv2.VideoCapture(url, cv2.CAP_ANY, [
+                cv2.CAP_PROP_OPEN_TIMEOUT_MSEC, timeout_ms,
+                cv2.CAP_PROP_READ_TIMEOUT_MSEC, timeout_ms
+            ])
             
             # Test connection
             if not cap.isOpened():
                 logger.error("Failed to open stream connection")
+                cap.release()
                 return None
             
             # Test first frame
@@ -90,25 +232,201 @@ class VideoStreamHandler:
             logger.error(f"Stream initialization error: {e}")
             return None
     
+    def _initialize_mjpeg(self):
+        """Connect to an HTTP MJPEG stream without decoding its frames."""
+        logger.info(f"Connecting to MJPEG stream: {self.stream_url}")
+        stream = MJPEGStream(self.stream_url, Config.STREAM_TIMEOUT)
+        if not stream.open():
+            return None
+        
+        jpeg = stream.read_jpeg()
+        if jpeg is None:
+            logger.error("Failed to read first frame from stream")
+            stream.release()
+            return None
+        
+        self.frame_cache.publish_jpeg(jpeg)
+        logger.info(f"MJPEG stream connected successfully, first frame: {len(jpeg)} bytes")
+        return stream
+    
+    def _read_frame(self, wanted: bool = True):
+        """
+        Read the next frame from the source.
+        
+        Args:
+            wanted: Whether the frame will be analysed; in low-latency mode an
+                unwanted frame is only grabbed, not retrieved
+        
+        Returns:
+            Tuple of (success, frame). The frame is raw JPEG bytes in passthrough
+            mode (already published to viewers), otherwise a BGR frame, and None
+            if it was not retrieved
+        """
+        if isinstance(self.cap, MJPEGStream):
+            jpeg = self.cap.read_jpeg()
+            if jpeg is not None:
+                self.frame_cache.publish_jpeg(jpeg)
+            return jpeg is not None, jpeg
+        if Config.LOW_LATENCY_CAPTURE:
+            if not self.cap.grab():
+                return False, None
+            if not wanted:
+                return True, None
+            ret, frame = self.cap.retrieve()
+        else:
+            ret, frame = self.cap.read()
+        return ret and frame is not None, frame
+    
+    def _frame_wanted(self, frame_number: int) -> bool:
+        """Check whether the capture with this number will be handed to inference."""
+        if Config.ADAPTIVE_FRAME_SKIP:
+            # Adaptive mode paces in the inference loop; frames before the next slot would be skipped there
+            controller = self.rate_controller
+            return controller is None or time.time() >= controller.next_due
+        return frame_number % Config.FRAME_SKIP == 0
+    
+    def _open_camera(self, index: int, fallback_index: int):
+        """Open a local camera with the configured capture settings."""
+        return secure_camera_capture(
+            index,
+            fallback_index,
+            backend=camera_backend(Config.CAMERA_BACKEND),
+            width=Config.CAMERA_WIDTH,
+            height=Config.CAMERA_HEIGHT,
+            fps=Config.CAMERA_FPS,
+            buffer_size=1 if Config.LOW_LATENCY_CAPTURE else 0
+        )
+    
+    def _open_primary(self):
+        """Open the configured stream or camera."""
+        if self.use_stream:
+            return self._initialize_stream()
+        return self._open_camera(self.camera_index, self.camera_fallback_index)
+    
+    def _open_standby(self):
+        """Open the standby source; it is always decoded, never passed through."""
+        logger.info(f"Opening standby source: {self.standby_source}")
+        if self.standby_source.isdigit():
+            index = int(self.standby_source)
+            return self._open_camera(index, index)
+        return self._initialize_stream(self.standby_source)
+    
+    def _switch_source(self, cap, source: str = None):
+        """
+        Make cap the source the capture loop reads from.
+        
+        Args:
+            cap: Opened capture, or None while no source is available
+            source: "primary" or "standby"; None marks the status as stale
+        """
+        self.cap = cap
+        self.active_source = source
+        with self.status_lock:
+            self.status_data = dict(self.status_data, source=source, stale=source is None)
+            self.status_seq += 1
+            self.status_changed.notify_all()
+        for listener in self.status_listeners:
+            listener()
+    
+    def _primary_reconnected(self, cap):
+        """Hand a reopened primary source to the capture loop (reconnect thread)."""
+        if not self.running:
+            safe_release_resources(cap)
+            return
+        self.reconnected_cap = cap
+    
+    def _standby_reconnected(self, cap):
+        """Hand a reopened standby source to the capture loop (reconnect thread)."""
+        if not self.running:
+            safe_release_resources(cap)
+            return
+        self.reconnected_standby = cap
+    
+    def _start_standby_drain(self):
+        """Keep grabbing the idle standby, so its driver buffer holds no old frames at a switch."""
+        if self.standby_cap is None or (self.standby_drain is not None and self.standby_drain.is_alive()):
+            return
+        self._standby_drain_stop.clear()
+        self.standby_drain = threading.Thread(
+            target=self._drain_standby, args=(self.standby_cap,), name=f"standby-drain-{self.stream_id}", daemon=True
+        )
+        self.standby_drain.start()
+    
+    def _stop_standby_drain(self):
+        """Stop grabbing the standby before another thread reads from it."""
+        self._standby_drain_stop.set()
+        drain = self.standby_drain
+        if drain is not None and drain is not threading.current_thread():
+            drain.join(timeout=Config.STREAM_TIMEOUT + 1.0)
+        self.standby_drain = None
+    
+    def _drain_standby(self, cap):
+        # grab() waits for the source's next frame, which paces this loop;
+        # frames are never decoded
+        failures = 0
+        while self.running and not self._standby_drain_stop.is_set():
+            if cap.grab():
+                failures = 0
+                continue
+            failures += 1
+            if failures >= 10:
+                logger.warning("Standby source lost while idle, reconnecting it")
+                self.standby_cap = None
+                safe_release_resources(cap)
+                self.standby_reconnector.start()
+                return
+            self._standby_drain_stop.wait(0.1)
+    
+    def _source_lost(self):
+        """Switch to the standby source, or mark the stream down, and reconnect in the background."""
+        if self.active_source == 'standby':
+            logger.error("Standby source failed")
+            safe_release_resources(self.standby_cap)
+            self.standby_cap = None
+            self._switch_source(None)
+            self.standby_reconnector.start()
+            return
+        
+        safe_release_resources(self.cap)
+        self._stop_standby_drain()
+        if self.standby_cap is not None:
+            logger.warning("Primary source lost, switching to standby source")
+            self._switch_source(self.standby_cap, 'standby')
+        else:
+            logger.warning("Primary source lost, status is stale until it reconnects")
+            self._switch_source(None)
+        self.reconnector.start()
+    
     def initialize(self):
         """Initialize camera and detectors."""
         try:
-            self.emotion_detector = FER(mtcnn=True)
-            self.detector = dlib.get_frontal_face_detector()
-            self.predictor = dlib.shape_predictor(Config.SHAPE_PREDICTOR_PATH)
+            if Config.INFERENCE_BACKEND == 'process':
+                # Models live in the worker processes only
+                self.process_backend = get_process_backend()
+            else:
+                models = get_models()
+                self.emotion_detector, self.detector, self.predictor = models
+                self.analyzer = create_analyzer(models, self.roi)
             
             # Initialize camera based on configuration
-            if Config.USE_STREAM:
-                logger.info(f"Using network stream mode - URL: {Config.STREAM_URL}")
-                self.cap = self._initialize_stream()
+            if self.use_stream:
+                logger.info(f"Using network stream mode - URL: {self.stream_url}")
             else:
-                logger.info(f"Using local camera mode - Index: {Config.CAMERA_INDEX}")
-                self.cap = secure_camera_capture(
-                    Config.CAMERA_INDEX,
-                    Config.CAMERA_FALLBACK_INDEX
-                )
+                logger.info(f"Using local camera mode - Index: {self.camera_index}")
+            primary = self._open_primary()
             
-            if self.cap is None:
+            # The standby is opened up front so switching to it is instant
+            if self.standby_source:
+                self.standby_cap = self._open_standby()
+                if self.standby_cap is None:
+                    logger.warning("Standby source unavailable")
+            
+            if primary is not None:
+                self._switch_source(primary, 'primary')
+            elif self.standby_cap is not None:
+                logger.warning("Primary source unavailable, starting on standby source")
+                self._switch_source(self.standby_cap, 'standby')
+            else:
                 raise RuntimeError("Could not initialize camera/stream")
             
             logger.info("Video handler initialized successfully")
@@ -123,28 +441,48 @@ class VideoStreamHandler:
             return "invalid_frame", "Unknown", 0.0
         
         try:
-            emotions = self.emotion_detector.detect_emotions(frame)
+            analysis = self.analyze(frame)
+            if analysis.box is None:
+                return "no_face", "Unknown", 0.0
             
+            # Eye closure is judged on every frame, even before the first emotion result
+            emotions = analysis.emotions
             if emotions:
                 dominant_emotion = sanitize_emotion_label(
-                    max(emotions[0]['emotions'], key=emotions[0]['emotions'].get)
+                    max(emotions, key=emotions.get)
                 )
-                
-                sleep_prob = calculate_sleep_probability(emotions[0]['emotions'])
-                sleep_status = self.determine_sleep_status(frame, sleep_prob)
-                
-                return dominant_emotion, sleep_status, sleep_prob
+                sleep_prob = calculate_sleep_probability(emotions)
             else:
-                return "no_face", "Unknown", 0.0
-                
+                dominant_emotion, sleep_prob = "Unknown", 0.0
+            
+            sleep_status = self.determine_sleep_status(analysis.eyes_closed, sleep_prob)
+            return dominant_emotion, sleep_status, sleep_prob
+            
         except Exception as e:
             logger.warning(f"Error in emotion detection: {e}")
             return "error", "Unknown", 0.0
     
-    def determine_sleep_status(self, frame: np.ndarray, sleep_prob: float) -> str:
+    def analyze(self, frame: np.ndarray):
+        """Run face analysis in-process or on the process backend, unless the frame is unchanged."""
+        gate = self.change_gate
+        if gate is not None and gate.unchanged(frame):
+            return gate.analysis
+        
+        if self.process_backend is None:
+            analysis = self.analyzer.analyze(frame)
+        else:
+            region = self.roi.fit(frame.shape) if self.roi is not None else None
+            analysis = self.process_backend.analyze(self.stream_id, frame, region)
+            if self.roi is not None and analysis.box is not None:
+                self.roi.observe(analysis.box, frame.shape)
+        
+        if gate is not None:
+            gate.update(frame, analysis)
+        return analysis
+    
+    def determine_sleep_status(self, eyes_closed: bool, sleep_prob: float) -> str:
         """Determine sleep status based on eye closure duration and emotion probability."""
         current_time = time.time()
-        eyes_closed = detect_eye_closure(frame, self.detector, self.predictor)
         
         if eyes_closed:
             return self._handle_eyes_closed(current_time)
@@ -177,38 +515,65 @@ class VideoStreamHandler:
         """Process frame and update status."""
         emotion, sleep_status, sleep_prob = self.detect_emotion_and_sleep(frame)
         
+        status = {
+            'emotion': emotion,
+            'sleep_status': sleep_status,
+            'sleep_probability': round(sleep_prob, 2),
+            'source': self.active_source,
+            'stale': False
+        }
         with self.status_lock:
-            self.status_data = {
-                'emotion': emotion,
-                'sleep_status': sleep_status,
-                'sleep_probability': round(sleep_prob, 2)
-            }
+            changed = status != self.status_data
+            if changed:
+                self.status_data = status
+                self.status_seq += 1
+                self.status_changed.notify_all()
+        if changed:
+            for listener in self.status_listeners:
+                listener()
         
         return frame
     
-    def run(self):
-        """Main video capture loop."""
-        self.running = True
-        logger.info("Starting video capture...")
+    def _capture_loop(self):
+        """Read frames as fast as the source delivers them and publish the newest."""
         consecutive_failures = 0
         max_failures = 10
         
         while self.running:
-            ret, frame = self.cap.read()
-            if not ret or frame is None:
+            reconnected = self.reconnected_cap
+            if reconnected is not None:
+                self.reconnected_cap = None
+                self.reconnects += 1
+                logger.info("Primary source reconnected")
+                self._switch_source(reconnected, 'primary')
+                consecutive_failures = 0
+                self._start_standby_drain()
+            
+            standby = self.reconnected_standby
+            if standby is not None:
+                self.reconnected_standby = None
+                logger.info("Standby source reopened")
+                self.standby_cap = standby
+                if self.cap is None:
+                    self._switch_source(standby, 'standby')
+                    consecutive_failures = 0
+                else:
+                    self._start_standby_drain()
+            
+            if self.cap is None:
+                # No source until the reconnect thread succeeds
+                time.sleep(0.1)
+                continue
+            
+            wanted = self._frame_wanted(self.frame_count + 1)
+            ok, frame = self._read_frame(wanted)
+            if not ok:
                 consecutive_failures += 1
                 logger.warning(f"Failed to read frame from camera/stream (attempt {consecutive_failures}/{max_failures})")
                 
-                # Try to reconnect if using stream
-                if Config.USE_STREAM and consecutive_failures >= max_failures:
-                    logger.info("Attempting to reconnect to stream...")
-                    if self.cap:
-                        self.cap.release()
-                    self.cap = self._initialize_stream()
-                    if self.cap is None:
-                        logger.error("Failed to reconnect to stream")
-                        time.sleep(5)  # Wait longer before retry
-                        continue
+                # Fail over and reconnect without blocking this loop
+                if consecutive_failures >= max_failures:
+                    self._source_lost()
                     consecutive_failures = 0
                 
                 time.sleep(0.1)
@@ -220,16 +585,77 @@ class VideoStreamHandler:
             self.frame_count += 1
             
             # Skip frames for performance
-            if self.frame_count % Config.FRAME_SKIP == 0:
-                # Process frame
-                processed_frame = self.process_frame(frame)
-                
-                # Store frame with lock
-                with self.frame_lock:
-                    self.frame = processed_frame
-            
-            # Control frame rate (~30 FPS)
-            time.sleep(0.033)
+            if wanted and frame is not None:
+                self.frame_slot.put(frame)
+    
+    def start_capture(self, pool: InferencePool = None):
+        """
+        Start the capture thread.
+        
+        Args:
+            pool: Shared inference pool to hand frames to; without one the
+                caller is expected to run the inference loop via run()
+        """
+        self.running = True
+        logger.info(f"Starting video capture for stream {self.stream_id}...")
+        self.frame_slot = LatestFrameSlot()
+        self.rate_controller = None
+        if Config.ADAPTIVE_FRAME_SKIP:
+            self.rate_controller = AdaptiveRateController(
+                Config.INFERENCE_CPU_BUDGET, Config.MAX_FPS, Config.MIN_ANALYSIS_FPS
+            )
+        if pool is not None:
+            pool.attach(self)
+        if self.active_source == 'standby':
+            # Started on the standby because the primary was down at initialize()
+            self.reconnector.start()
+        else:
+            self._start_standby_drain()
+        if self.standby_source and self.standby_cap is None:
+            # Failed to open at initialize(); keep trying in the background
+            self.standby_reconnector.start()
+        self.capture_thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self.capture_thread.start()
+    
+    def handle_frame(self, frame: np.ndarray, captured_at: float):
+        """Analyse one captured frame unless the adaptive rate says to skip it."""
+        if self.rate_controller is not None and not self.rate_controller.ready():
+            self.frames_rate_limited += 1
+            return
+        
+        passthrough = isinstance(frame, bytes)
+        if passthrough:
+            # Only frames picked for analysis are decoded
+            frame = decode_jpeg(frame, Config.MJPEG_DECODE_SCALE)
+            self.frames_decoded += 1
+            if frame is None:
+                logger.warning("Could not decode JPEG frame from stream")
+                return
+        
+        started_at = time.time()
+        processed_frame = self.process_frame(frame)
+        if self.rate_controller is not None:
+            self.rate_controller.record(time.time() - started_at)
+        self.frames_processed += 1
+        self.last_latency = time.time() - captured_at
+        
+        # Store frame with lock
+        with self.frame_lock:
+            self.frame = processed_frame
+        
+        # Encode once for every reader, outside the frame lock; passthrough
+        # frames were already forwarded to viewers as received
+        if not passthrough:
+            self.frame_cache.publish(processed_frame)
+    
+    def run(self):
+        """Main inference loop, fed by a separate capture thread."""
+        self.start_capture()
+        
+        while self.running:
+            frame, captured_at = self.frame_slot.take(timeout=0.5)
+            if frame is not None:
+                self.handle_frame(frame, captured_at)
         
         self.cleanup()
     
@@ -237,99 +663,458 @@ class VideoStreamHandler:
         """Clean up resources."""
         logger.info("Cleaning up video handler...")
         self.running = False
-        safe_release_resources(self.cap)
+        self.reconnector.stop()
+        self.standby_reconnector.stop()
+        self._stop_standby_drain()
+        if self.frame_slot is not None:
+            self.frame_slot.close()
+        capture_thread = self.capture_thread
+        if capture_thread is not None and capture_thread is not threading.current_thread():
+            capture_thread.join(timeout=2.0)
+        safe_release_resources(self.cap, self.standby_cap, self.reconnected_cap, self.reconnected_standby)
+        self.cap = self.standby_cap = self.reconnected_cap = self.reconnected_standby = None
         cv2.destroyAllWindows()
+        if self.bus_writer is not None:
+            self.bus_writer.set_running(False)
+    
+    def get_metrics(self):
+        """Get capture and inference pipeline counters."""
+        slot = self.frame_slot
+        metrics = {
+            'frames_captured': self.frame_count,
+            'frames_processed': self.frames_processed,
+            'frames_skipped': slot.dropped if slot is not None else 0,
+            'latency_ms': round(self.last_latency * 1000, 1),
+            'adaptive': Config.ADAPTIVE_FRAME_SKIP,
+            'source': self.active_source,
+            'reconnects': self.reconnects
+        }
+        if self.passthrough:
+            metrics['frames_decoded'] = self.frames_decoded
+        controller = self.rate_controller
+        if controller is not None:
+            metrics['frames_rate_limited'] = self.frames_rate_limited
+            metrics['processing_ms'] = round(controller.processing_time * 1000, 1)
+            metrics['analysis_fps'] = round(controller.effective_fps, 2)
+        analyzer = self.analyzer
+        if analyzer is not None and analyzer.emotion_interval > 0:
+            metrics['emotion_runs'] = analyzer.emotion_runs
+            metrics['emotion_reused'] = analyzer.emotion_reused
+        tracker = analyzer.tracker if analyzer is not None else None
+        if tracker is not None:
+            metrics['face_detections'] = tracker.detections
+            metrics['face_tracked'] = tracker.tracked
+        if self.roi is not None:
+            metrics['roi_misses'] = self.roi.misses
+        if self.change_gate is not None:
+            metrics.update(self.change_gate.stats())
+        batcher = getattr(self.emotion_detector, 'batcher', None)
+        if batcher is not None:
+            metrics.update(batcher.stats())
+        return metrics
     
     def get_frame_base64(self):
         """Get current frame as base64 encoded string."""
-        with self.frame_lock:
-            if self.frame is None:
-                return None
-            
-            _, buffer = cv2.imencode('.jpg', self.frame, [cv2.IMWRITE_JPEG_QUALITY, 90])
-            frame_base64 = base64.b64encode(buffer).decode('utf-8')
-            return frame_base64
+        encoded = self.frame_cache.latest()
+        return encoded.base64 if encoded is not None else None
     
     def get_status(self):
         """Get current driver status."""
         with self.status_lock:
             return self.status_data
+    
+    def wait_status(self, since: int, timeout: float, epoch: str = None):
+        """
+        Wait until the status changes past sequence number since.
+        
+        Args:
+            since: Status sequence number the client already has
+            timeout: Maximum seconds to wait
+            epoch: Epoch of since; None if unknown, e.g. a bare sequence number
+        
+        Returns:
+            Tuple of (epoch, sequence number, status); epoch and sequence are
+            unchanged on timeout
+        """
+        with self.status_lock:
+            self.status_changed.wait_for(lambda: status_changed_since(self, since, epoch), timeout)
+            return self.status_epoch, self.status_seq, self.status_data
 
-# Global video handler
-video_handler = VideoStreamHandler()
+# Global video handlers: one per fleet stream, or a single configured source
+inference_pool = None
+fleet_streams = parse_fleet_streams(Config.FLEET_STREAMS)
+if fleet_streams:
+    inference_pool = InferencePool(Config.INFERENCE_WORKERS)
+    video_handlers = {
+        stream_id: VideoStreamHandler(stream_id, source)
+        for stream_id, source in fleet_streams
+    }
+else:
+    video_handlers = {'default': VideoStreamHandler()}
+video_handler = next(iter(video_handlers.values()))
 video_thread = None
 
+# Frame bus: one analysis process publishes, HTTP worker processes only read
+if Config.FRAME_BUS_ROLE == 'publisher':
+    for handler in video_handlers.values():
+        handler.bus_writer = publish_to_bus(handler, Config.FRAME_BUS_PREFIX, Config.FRAME_BUS_SIZE)
+elif Config.FRAME_BUS_ROLE == 'reader':
+    for handler in video_handlers.values():
+        mirror_from_bus(handler, Config.FRAME_BUS_PREFIX, Config.FRAME_BUS_POLL_MS / 1000.0)
+
+def parse_status_token(value: str):
+    """
+    Parse a client's status token.
+    
+    Args:
+        value: "epoch-seq" as returned in the status "token" field, or a bare sequence number
+    
+    Returns:
+        Tuple of (epoch or None, sequence number), or None if the value is malformed
+    """
+    if value is None:
+        return None
+    epoch, _, seq = value.rpartition('-')
+    try:
+        return epoch or None, int(seq)
+    except ValueError:
+        return None
+
+def status_changed_since(handler, since: int, epoch: str = None) -> bool:
+    """
+    Check whether a client holding status since (of epoch) is out of date.
+    
+    A sequence number from another epoch, or one ahead of the current
+    counter, predates a restart and is answered right away. Call with the
+    handler's status_lock held.
+    """
+    if not handler.running or handler.status_seq != since:
+        return True
+    return epoch is not None and epoch != handler.status_epoch
+
+def get_handler(stream_id):
+    """Look up a stream's handler; None selects the default stream."""
+    if stream_id is None:
+        return video_handler
+    return video_handlers.get(stream_id)
+
+def stream_not_found(stream_id):
+    """Build the error response for an unknown stream."""
+    return jsonify({'error': f'Unknown stream: {stream_id}'}), 404
+
+def bus_controlled():
+    """Build the error response for start/stop in a frame bus reader."""
+    return jsonify({'error': 'Streams are controlled by the frame bus publisher'}), 409
+
+def conditional_json(payload: dict, kind: str, token: str):
+    """
+    Build a JSON response tagged with a sequence-number ETag.
+    
+    Clients sending a matching If-None-Match get a body-less 304 instead.
+    
+    Args:
+        payload: Response body
+        kind: ETag prefix, e.g. "status"
+        token: Epoch and sequence number of the payload as "epoch-seq"
+    """
+    etag = f"{kind}-{token}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+def _set_readiness(state: str, progress: float, error: str = None):
+    readiness.update({'state': state, 'progress': progress, 'error': error})
+
+def preload_models():
+    """Load and warm up the models so the first /api/start does not wait on them."""
+    started_at = time.time()
+    try:
+        _set_readiness('loading', 0.1)
+        if Config.INFERENCE_BACKEND == 'process':
+            # Workers load and warm up their own models before reporting ready
+            get_process_backend().wait_ready()
+        else:
+            models = get_models()
+            _set_readiness('warming_up', 0.7)
+            warm_up(models)
+        _set_readiness('ready', 1.0)
+        logger.info(f"Models ready in {time.time() - started_at:.1f}s")
+    except Exception as e:
+        logger.error(f"Model preload failed: {e}")
+        _set_readiness('error', 0.0, str(e))
+
+def start_preload():
+    """Start model preloading in the background."""
+    threading.Thread(target=preload_models, name="model-preload", daemon=True).start()
+
 @app.route('/')
 def index():
     """Serve the index page."""
     return Response(open('frontend/public/index.html').read(), mimetype='text/html')
 
-@app.route('/api/status')
-def get_status():
-    """Get current driver status."""
+@app.route('/api/ready')
+def ready():
+    """Report model loading progress; 200 once inference can start immediately."""
+    if Config.FRAME_BUS_ROLE == 'reader':
+        # Readers never load models; they can serve once every stream's bus block is attached
+        attached = sum(handler.bus_attached for handler in video_handlers.values())
+        state = 'ready' if attached == len(video_handlers) else 'waiting_for_publisher'
+        return jsonify({
+            'state': state, 'progress': attached / len(video_handlers), 'error': None
+        }), 200 if state == 'ready' else 503
+    return jsonify(readiness), 200 if readiness['state'] == 'ready' else 503
+
+@app.route('/api/streams')
+def list_streams():
+    """List configured streams and whether they are running."""
+    streams = [
+        {'stream_id': stream_id, 'running': handler.running}
+        for stream_id, handler in video_handlers.items()
+    ]
+    response = {'streams': streams}
+    if inference_pool is not None:
+        response['pool'] = inference_pool.stats()
+    return jsonify(response)
+
+@app.route('/api/status', defaults={'stream_id': None})
+@app.route('/api/streams/<stream_id>/status')
+def get_status(stream_id):
+    """Get current driver status; with ?since=TOKEN, long-poll until it changes."""
+    handler = get_handler(stream_id)
+    if handler is None:
+        return stream_not_found(stream_id)
     try:
-        status = video_handler.get_status()
-        return jsonify(status)
+        since = parse_status_token(request.args.get('since'))
+        if since is None:
+            with handler.status_lock:
+                epoch, seq, status = handler.status_epoch, handler.status_seq, handler.status_data
+        else:
+            timeout = min(request.args.get('timeout', 25.0, type=float), 60.0)
+            epoch, seq, status = handler.wait_status(since[1], timeout, since[0])
+        token = f"{epoch}-{seq}"
+        return conditional_json(dict(status, seq=seq, token=token), 'status', token)
     except Exception as e:
         logger.error(f"Error getting status: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/video')
-def video_feed():
+@app.route('/api/status/stream', defaults={'stream_id': None})
+@app.route('/api/streams/<stream_id>/status/stream')
+def status_stream(stream_id):
+    """Push status changes as Server-Sent Events."""
+    handler = get_handler(stream_id)
+    if handler is None:
+        return stream_not_found(stream_id)
+    
+    def generate():
+        epoch, seq = last_event
+        while handler.running:
+            new_epoch, new_seq, status = handler.wait_status(seq, 15.0, epoch)
+            if (new_epoch, new_seq) == (epoch, seq):
+                yield ': keepalive\n\n'
+                continue
+            epoch, seq = new_epoch, new_seq
+            yield f"id: {epoch}-{seq}\ndata: {json.dumps(status)}\n\n"
+    
+    # EventSource sends the last id it saw when it reconnects; an id from
+    # another boot gets the current status right away
+    last_event = parse_status_token(request.headers.get('Last-Event-ID'))
+    if last_event is None:
+        with handler.status_lock:
+            last_event = (handler.status_epoch, 0)
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/api/metrics', defaults={'stream_id': None})
+@app.route('/api/streams/<stream_id>/metrics')
+def get_metrics(stream_id):
+    """Get capture and inference pipeline counters."""
+    handler = get_handler(stream_id)
+    if handler is None:
+        return stream_not_found(stream_id)
+    try:
+        return jsonify(handler.get_metrics())
+    except Exception as e:
+        logger.error(f"Error getting metrics: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/roi', defaults={'stream_id': None}, methods=['GET', 'POST'])
+@app.route('/api/streams/<stream_id>/roi', methods=['GET', 'POST'])
+def driver_roi(stream_id):
+    """Get the driver-seat ROI, set it manually, or reset it to recalibrate."""
+    handler = get_handler(stream_id)
+    if handler is None:
+        return stream_not_found(stream_id)
+    roi = handler.roi
+    if roi is None:
+        return jsonify({'error': 'Driver ROI is disabled'}), 404
+    
+    if request.method == 'POST':
+        data = request.get_json(silent=True) or {}
+        if data.get('reset'):
+            roi.set_region(None)
+        else:
+            try:
+                region = tuple(int(data[key]) for key in ('x', 'y', 'w', 'h'))
+            except (KeyError, TypeError, ValueError):
+                return jsonify({'error': 'Expected integer x, y, w and h'}), 400
+            if region[2] <= 0 or region[3] <= 0:
+                return jsonify({'error': 'ROI width and height must be positive'}), 400
+            if region[0] < 0 or region[1] < 0:
+                return jsonify({'error': 'ROI x and y must not be negative'}), 400
+            frame = handler.frame
+            if frame is not None:
+                # Regions reaching past the frame are cut to the part that is visible
+                region = clamp_region(region, frame.shape)
+                if region is None:
+                    return jsonify({'error': 'ROI lies outside the frame'}), 400
+            roi.set_region(region)
+    
+    return jsonify({
+        'stream_id': roi.stream_id,
+        'region': list(roi.region) if roi.region else None,
+        'calibrated': roi.calibrated,
+        'calibration_samples': len(roi.samples)
+    })
+
+@app.route('/api/video', defaults={'stream_id': None})
+@app.route('/api/streams/<stream_id>/video')
+def video_feed(stream_id):
     """Stream video frames as JPEG images."""
+    handler = get_handler(stream_id)
+    if handler is None:
+        return stream_not_found(stream_id)
+    
     def generate():
-        while video_handler.running:
-            frame_base64 = video_handler.get_frame_base64()
-            if frame_base64:
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n'
-                       b'Content-Length: ' + str(len(frame_base64)).encode() + b'\r\n\r\n' +
-                       base64.b64decode(frame_base64) + b'\r\n')
-            else:
-                time.sleep(0.033)
+        # Only frames with a new sequence number are sent. A slow viewer is
+        # blocked in the write, and on return jumps straight to the newest
+        # frame, so it drops frames instead of queueing them.
+        seq = 0
+        while handler.running:
+            encoded = handler.frame_cache.wait_newer(seq, timeout=1.0)
+            if encoded is None:
+                continue
+            seq = encoded.seq
+            yield (b'--frame\r\n'
+                   b'Content-Type: image/jpeg\r\n'
+                   b'Content-Length: ' + str(len(encoded.jpeg)).encode() + b'\r\n\r\n')
+            yield encoded.jpeg
+            yield b'\r\n'
     
     return Response(generate(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
-@app.route('/api/frame')
-def get_frame():
+def websocket_feed(ws, stream_id):
+    """Push JPEG frames as binary messages and status changes as JSON text."""
+    handler = get_handler(stream_id)
+    if handler is None:
+        ws.close(reason=1008, message=f'Unknown stream: {stream_id}')
+        return
+    
+    frame_seq = 0
+    status_version = None
+    while handler.running and ws.connected:
+        # Status mostly changes right before a frame is published, so waiting on
+        # the frame cache wakes up promptly; source switches are seen on timeout
+        encoded = handler.frame_cache.wait_newer(frame_seq, timeout=1.0)
+        with handler.status_lock:
+            version, status = (handler.status_epoch, handler.status_seq), handler.status_data
+        if version != status_version:
+            status_version = version
+            ws.send(json.dumps(dict(status, seq=version[1])))
+        if encoded is not None:
+            # A slow client blocks here and then skips to the newest frame
+            frame_seq = encoded.seq
+            ws.send(encoded.jpeg)
+
+if Sock is not None:
+    sock = Sock(app)
+    sock.route('/api/ws', endpoint='websocket_feed', defaults={'stream_id': None})(websocket_feed)
+    sock.route('/api/streams/<stream_id>/ws', endpoint='stream_websocket_feed')(websocket_feed)
+
+@app.route('/api/frame', defaults={'stream_id': None})
+@app.route('/api/streams/<stream_id>/frame')
+def get_frame(stream_id):
     """Get a single frame as base64."""
+    handler = get_handler(stream_id)
+    if handler is None:
+        return stream_not_found(stream_id)
     try:
-        frame_base64 = video_handler.get_frame_base64()
-        if frame_base64:
-            return jsonify({'frame': frame_base64})
+        encoded = handler.frame_cache.latest()
+        if encoded is not None:
+            token = encoded.tag or f"{BOOT_ID}-{encoded.seq}"
+            return conditional_json({'frame': encoded.base64, 'seq': encoded.seq}, 'frame', token)
         else:
             return jsonify({'error': 'No frame available'}), 404
     except Exception as e:
         logger.error(f"Error getting frame: {e}")
         return jsonify({'error': str(e)}), 500
 
-@app.route('/api/start')
-def start_video():
+def start_handler(handler: VideoStreamHandler) -> bool:
+    """Initialize a stream and start its capture and inference."""
+    global video_thread
+    
+    if not handler.initialize():
+        return False
+    if inference_pool is not None:
+        inference_pool.start()
+        handler.start_capture(inference_pool)
+    else:
+        video_thread = threading.Thread(target=handler.run, daemon=True)
+        video_thread.start()
+    return True
+
+@app.route('/api/start', defaults={'stream_id': None})
+@app.route('/api/streams/<stream_id>/start')
+def start_video(stream_id):
     """Start video streaming."""
-    global video_handler, video_thread
+    handler = get_handler(stream_id)
+    if handler is None:
+        return stream_not_found(stream_id)
+    if Config.FRAME_BUS_ROLE == 'reader':
+        return bus_controlled()
     
-    if not video_handler.running:
-        if video_handler.initialize():
-            video_thread = threading.Thread(target=video_handler.run, daemon=True)
-            video_thread.start()
+    if not handler.running:
+        if start_handler(handler):
             return jsonify({'message': 'Video streaming started'})
         else:
             return jsonify({'error': 'Failed to initialize camera'}), 500
     else:
         return jsonify({'message': 'Video streaming already running'})
 
-@app.route('/api/stop')
-def stop_video():
+@app.route('/api/stop', defaults={'stream_id': None})
+@app.route('/api/streams/<stream_id>/stop')
+def stop_video(stream_id):
     """Stop video streaming."""
-    global video_handler
+    handler = get_handler(stream_id)
+    if handler is None:
+        return stream_not_found(stream_id)
+    if Config.FRAME_BUS_ROLE == 'reader':
+        return bus_controlled()
     
-    if video_handler.running:
-        video_handler.cleanup()
+    if handler.running:
+        handler.cleanup()
         return jsonify({'message': 'Video streaming stopped'})
     else:
         return jsonify({'message': 'Video streaming not running'})
 
+def create_app():
+    """
+    Build the app for a WSGI server, e.g. gunicorn 'app:create_app()'.
+    
+    Model preloading starts here rather than at import, so processes that
+    only import this module (inference workers, frame bus readers, tests)
+    do not load the models a second time.
+    """
+    if Config.PRELOAD_MODELS and Config.FRAME_BUS_ROLE != 'reader':
+        start_preload()
+    return app
+
 if __name__ == '__main__':
     logger.info("Starting Safe Drive API Server...")
+    # With the debug reloader, only the serving child process preloads
+    if Config.PRELOAD_MODELS and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_preload()
     app.run(debug=True, host='0.0.0.0', port=5000, threaded=True)
 
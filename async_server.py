@@ -0,0 +1,408 @@
+"""
+Asynchronous serving mode for many concurrent viewers.
+
+The Flask server spends one thread per open MJPEG, SSE or WebSocket
+connection. Here those long-lived connections are coroutines on one event
+loop instead: each stream has a single broadcaster task that is woken when
+the stream publishes a frame and fans the shared encoded frame and status out
+to every subscriber. A subscriber only holds the newest frame, so a slow
+viewer skips frames instead of queueing them or delaying anyone else.
+
+Capture and inference are unchanged and still run in the handlers' threads
+(or worker processes). Status long-polls are answered from the broadcasters
+as well. The remaining short JSON endpoints are served by the Flask app
+through a WSGI bridge on a small dedicated thread pool, so their behaviour
+stays in one place and no request can hold a bridge thread for long.
+
+Run with (requires aiohttp):
+    python async_server.py
+"""
+
+import asyncio
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from urllib.parse import unquote_to_bytes
+
+from aiohttp import web
+
+import app as flask_api
+from logger import logger
+
+MJPEG_BOUNDARY = 'frame'
+
+# Threads serving requests through the Flask app
+WSGI_THREADS = 8
+
+# Response headers that aiohttp sets itself from the body
+_HOP_BY_HOP = {'content-length', 'transfer-encoding', 'connection'}
+
+
+def wsgi_environ(request: web.Request, body: bytes) -> dict:
+    """
+    Build a PEP 3333 environ for an aiohttp request.
+
+    Args:
+        request: Incoming request
+        body: Request body, already read
+
+    Returns:
+        WSGI environ dictionary
+    """
+    path = request.raw_path.partition('?')[0]
+    environ = {
+        'REQUEST_METHOD': request.method,
+        'SCRIPT_NAME': '',
+        # PEP 3333: the undecoded path bytes as a latin-1 string
+        'PATH_INFO': unquote_to_bytes(path).decode('latin-1'),
+        'QUERY_STRING': request.query_string,
+        'SERVER_NAME': request.url.host or 'localhost',
+        'SERVER_PORT': str(request.url.port or ''),
+        'SERVER_PROTOCOL': f"HTTP/{request.version.major}.{request.version.minor}",
+        'REMOTE_ADDR': request.remote or '',
+        'CONTENT_TYPE': request.headers.get('Content-Type', ''),
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': request.scheme,
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in request.headers.items():
+        key = 'HTTP_' + name.upper().replace('-', '_')
+        if key in ('HTTP_CONTENT_TYPE', 'HTTP_CONTENT_LENGTH'):
+            continue
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def call_wsgi(wsgi_app, environ: dict) -> Tuple[int, list, bytes]:
+    """
+    Run a WSGI application to completion.
+
+    Args:
+        wsgi_app: WSGI callable
+        environ: Request environ
+
+    Returns:
+        Tuple of (status code, header list, body)
+    """
+    response = {}
+    chunks = []
+
+    def start_response(status, headers, exc_info=None):
+        if exc_info is not None and response:
+            raise exc_info[1].with_traceback(exc_info[2])
+        response['status'], response['headers'] = status, headers
+        return chunks.append
+
+    result = wsgi_app(environ, start_response)
+    try:
+        for chunk in result:
+            chunks.append(chunk)
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return int(response['status'].split(' ', 1)[0]), response['headers'], b''.join(chunks)
+
+
+class Subscriber:
+    """Mailbox of one viewer holding only the newest frame and status."""
+
+    def __init__(self):
+        self._event = asyncio.Event()
+        self._frame = None
+        self._status = None
+
+    def offer_frame(self, encoded):
+        self._frame = encoded
+        self._event.set()
+
+    def offer_status(self, epoch: str, seq: int, status: dict):
+        self._status = (epoch, seq, status)
+        self._event.set()
+
+    async def get(self, timeout: float) -> Tuple[Optional[object], Optional[Tuple[str, int, dict]]]:
+        """
+        Wait for a new frame or status.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            Tuple of (EncodedFrame or None, (epoch, seq, status) or None); both are None on timeout
+        """
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None, None
+        self._event.clear()
+        frame, status = self._frame, self._status
+        self._frame = self._status = None
+        return frame, status
+
+
+class StreamBroadcaster:
+    """One task per stream that fans published frames and status out to subscribers."""
+
+    def __init__(self, handler, loop: asyncio.AbstractEventLoop):
+        self.handler = handler
+        self.loop = loop
+        self.subscribers = set()
+        self.frames_sent = 0
+        self._wakeup = asyncio.Event()
+        self._frame_seq = 0
+        self._status_version = None
+        handler.frame_cache.listeners.append(self._on_publish)
+        handler.status_listeners.append(self._on_status)
+        self.task = loop.create_task(self._run())
+
+    def _on_publish(self, encoded):
+        # Called from the handler's inference thread
+        self.loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _on_status(self):
+        # Called from the handler's capture thread, e.g. when the source is lost
+        self.loop.call_soon_threadsafe(self._wakeup.set)
+
+    def subscribe(self) -> Subscriber:
+        """Register a viewer, primed with the current frame and status."""
+        subscriber = Subscriber()
+        encoded = self.handler.frame_cache.latest()
+        if encoded is not None:
+            subscriber.offer_frame(encoded)
+        with self.handler.status_lock:
+            subscriber.offer_status(self.handler.status_epoch, self.handler.status_seq, self.handler.status_data)
+        self.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        self.subscribers.discard(subscriber)
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            encoded = self.handler.frame_cache.latest()
+            if encoded is not None and encoded.seq != self._frame_seq:
+                self._frame_seq = encoded.seq
+                for subscriber in self.subscribers:
+                    subscriber.offer_frame(encoded)
+                    self.frames_sent += 1
+
+            # Woken by frame publishes and by status-only changes
+            with self.handler.status_lock:
+                version = (self.handler.status_epoch, self.handler.status_seq)
+                status = self.handler.status_data
+            if version != self._status_version:
+                self._status_version = version
+                for subscriber in self.subscribers:
+                    subscriber.offer_status(*version, status)
+
+    def stats(self) -> Dict[str, int]:
+        """Get subscriber and fan-out counters."""
+        return {'subscribers': len(self.subscribers), 'frames_sent': self.frames_sent}
+
+
+class AsyncServer:
+    """aiohttp application serving the streaming endpoints from broadcasters."""
+
+    def __init__(self, handlers: Dict[str, object] = None, wsgi_app=None, wsgi_threads: int = WSGI_THREADS):
+        """
+        Args:
+            handlers: VideoStreamHandlers by stream id, defaults to the Flask app's
+            wsgi_app: Flask app serving all other endpoints, defaults to app.app
+            wsgi_threads: Size of the thread pool running wsgi_app
+        """
+        self.handlers = handlers if handlers is not None else flask_api.video_handlers
+        self.default_stream = next(iter(self.handlers))
+        self.wsgi_app = wsgi_app if wsgi_app is not None else flask_api.app
+        # Dedicated to the bridge, so it cannot starve or be starved by other executor work
+        self.wsgi_executor = ThreadPoolExecutor(max_workers=wsgi_threads, thread_name_prefix='wsgi')
+        self.broadcasters: Dict[str, StreamBroadcaster] = {}
+
+    def broadcaster(self, request: web.Request) -> StreamBroadcaster:
+        """Get the broadcaster of the requested stream, starting it on first use."""
+        stream_id = request.match_info.get('stream_id', self.default_stream)
+        handler = self.handlers.get(stream_id)
+        if handler is None:
+            raise web.HTTPNotFound(
+                text=json.dumps({'error': f'Unknown stream: {stream_id}'}), content_type='application/json'
+            )
+        broadcaster = self.broadcasters.get(stream_id)
+        if broadcaster is None:
+            broadcaster = StreamBroadcaster(handler, asyncio.get_running_loop())
+            self.broadcasters[stream_id] = broadcaster
+        return broadcaster
+
+    async def video_feed(self, request: web.Request) -> web.StreamResponse:
+        """Stream video frames as multipart JPEG."""
+        broadcaster = self.broadcaster(request)
+        response = web.StreamResponse(headers={
+            'Content-Type': f'multipart/x-mixed-replace; boundary={MJPEG_BOUNDARY}',
+            'Access-Control-Allow-Origin': '*'
+        })
+        await response.prepare(request)
+
+        subscriber = broadcaster.subscribe()
+        try:
+            while broadcaster.handler.running:
+                encoded, _ = await subscriber.get(timeout=1.0)
+                if encoded is None:
+                    continue
+                # The write waits for the socket to drain; meanwhile the
+                # mailbox keeps only the newest frame
+                await response.write(
+                    b'--' + MJPEG_BOUNDARY.encode() + b'\r\n'
+                    b'Content-Type: image/jpeg\r\n'
+                    b'Content-Length: ' + str(len(encoded.jpeg)).encode() + b'\r\n\r\n'
+                    + encoded.jpeg + b'\r\n'
+                )
+        except ConnectionResetError:
+            pass
+        finally:
+            broadcaster.unsubscribe(subscriber)
+        return response
+
+    async def get_status(self, request: web.Request) -> web.Response:
+        """Get current driver status; with ?since=TOKEN, long-poll until it changes."""
+        broadcaster = self.broadcaster(request)
+        handler = broadcaster.handler
+        since = flask_api.parse_status_token(request.query.get('since'))
+
+        if since is not None:
+            epoch, seq = since
+            try:
+                timeout = min(float(request.query.get('timeout', 25.0)), 60.0)
+            except ValueError:
+                timeout = 25.0
+            deadline = asyncio.get_running_loop().time() + timeout
+            subscriber = broadcaster.subscribe()
+            try:
+                while True:
+                    with handler.status_lock:
+                        if flask_api.status_changed_since(handler, seq, epoch):
+                            break
+                    remaining = deadline - asyncio.get_running_loop().time()
+                    if remaining <= 0:
+                        break
+                    await subscriber.get(remaining)
+            finally:
+                broadcaster.unsubscribe(subscriber)
+
+        with handler.status_lock:
+            epoch, seq, status = handler.status_epoch, handler.status_seq, handler.status_data
+        token = f"{epoch}-{seq}"
+        return self.conditional_json(request, dict(status, seq=seq, token=token), f"status-{token}")
+
+    @staticmethod
+    def conditional_json(request: web.Request, payload: dict, etag: str) -> web.Response:
+        """Build a JSON response with an ETag, or a 304 if the client already has it."""
+        headers = {'ETag': f'"{etag}"', 'Cache-Control': 'no-cache', 'Access-Control-Allow-Origin': '*'}
+        known = [tag.strip() for tag in request.headers.get('If-None-Match', '').split(',')]
+        if f'"{etag}"' in known or '*' in known:
+            return web.Response(status=304, headers=headers)
+        return web.json_response(payload, headers=headers)
+
+    async def status_stream(self, request: web.Request) -> web.StreamResponse:
+        """Push status changes as Server-Sent Events."""
+        broadcaster = self.broadcaster(request)
+        response = web.StreamResponse(headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'Access-Control-Allow-Origin': '*'
+        })
+        await response.prepare(request)
+
+        # An id from another boot (or a bare number) is superseded by any other status
+        last_epoch, last_seq = flask_api.parse_status_token(request.headers.get('Last-Event-ID')) or (None, 0)
+        subscriber = broadcaster.subscribe()
+        try:
+            while broadcaster.handler.running:
+                _, update = await subscriber.get(timeout=15.0)
+                if update is None:
+                    await response.write(b': keepalive\n\n')
+                    continue
+                epoch, seq, status = update
+                if seq == last_seq and last_epoch in (None, epoch):
+                    continue
+                last_epoch, last_seq = epoch, seq
+                await response.write(f"id: {epoch}-{seq}\ndata: {json.dumps(status)}\n\n".encode())
+        except ConnectionResetError:
+            pass
+        finally:
+            broadcaster.unsubscribe(subscriber)
+        return response
+
+    async def websocket_feed(self, request: web.Request) -> web.WebSocketResponse:
+        """Push JPEG frames as binary messages and status changes as JSON text."""
+        broadcaster = self.broadcaster(request)
+        ws = web.WebSocketResponse(heartbeat=30.0)
+        await ws.prepare(request)
+
+        # Incoming messages are ignored, but must be read to notice the close
+        reader = asyncio.ensure_future(self._drain(ws))
+        subscriber = broadcaster.subscribe()
+        try:
+            while broadcaster.handler.running and not ws.closed:
+                encoded, update = await subscriber.get(timeout=1.0)
+                if update is not None:
+                    _, seq, status = update
+                    await ws.send_str(json.dumps(dict(status, seq=seq)))
+                if encoded is not None:
+                    await ws.send_bytes(encoded.jpeg)
+        except ConnectionResetError:
+            pass
+        finally:
+            broadcaster.unsubscribe(subscriber)
+            reader.cancel()
+            await ws.close()
+        return ws
+
+    @staticmethod
+    async def _drain(ws: web.WebSocketResponse):
+        async for _ in ws:
+            pass
+
+    async def broadcast_stats(self, request: web.Request) -> web.Response:
+        """Get per-stream subscriber counts."""
+        return web.json_response(
+            {stream_id: broadcaster.stats() for stream_id, broadcaster in self.broadcasters.items()},
+            headers={'Access-Control-Allow-Origin': '*'}
+        )
+
+    async def wsgi_bridge(self, request: web.Request) -> web.Response:
+        """Serve any other request with the Flask app on the bridge's thread pool."""
+        body = await request.read()
+        environ = wsgi_environ(request, body)
+        status, headers, body = await asyncio.get_running_loop().run_in_executor(
+            self.wsgi_executor, call_wsgi, self.wsgi_app, environ
+        )
+        headers = [(name, value) for name, value in headers if name.lower() not in _HOP_BY_HOP]
+        return web.Response(body=body, status=status, headers=headers)
+
+    def make_app(self) -> web.Application:
+        """Build the aiohttp application."""
+        application = web.Application()
+        routes = [
+            ('/status', self.get_status),
+            ('/video', self.video_feed),
+            ('/status/stream', self.status_stream),
+            ('/ws', self.websocket_feed),
+        ]
+        for suffix, route_handler in routes:
+            application.router.add_get('/api' + suffix, route_handler)
+            application.router.add_get('/api/streams/{stream_id}' + suffix, route_handler)
+        application.router.add_get('/api/broadcast', self.broadcast_stats)
+        application.router.add_route('*', '/{tail:.*}', self.wsgi_bridge)
+        return application
+
+
+if __name__ == '__main__':
+    logger.info("Starting Safe Drive async API Server...")
+    web.run_app(AsyncServer(wsgi_app=flask_api.create_app()).make_app(), host='0.0.0.0', port=5000)
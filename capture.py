@@ -0,0 +1,76 @@
+"""
+Frame handoff between the capture thread and the inference worker.
+
+The capture side always overwrites the pending frame, so the inference
+worker picks up the newest frame whenever it becomes free and never works
+through a backlog of stale ones.
+"""
+
+import threading
+import time
+from typing import Optional, Tuple
+
+import numpy as np
+
+
+class LatestFrameSlot:
+    """Single-slot buffer where a newer frame replaces an unconsumed one."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._frame = None
+        self._timestamp = 0.0
+        self.closed = False
+        self.published = 0
+        self.dropped = 0
+        # Optional callable invoked after each publish, e.g. to schedule a worker
+        self.listener = None
+
+    def put(self, frame: np.ndarray, timestamp: Optional[float] = None):
+        """
+        Publish a frame, replacing any frame the worker has not taken yet.
+
+        Args:
+            frame: Captured frame
+            timestamp: Capture time, defaults to now
+        """
+        with self._condition:
+            if self.closed:
+                return
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self._timestamp = time.time() if timestamp is None else timestamp
+            self.published += 1
+            self._condition.notify()
+        if self.listener is not None:
+            self.listener()
+
+    @property
+    def pending(self) -> bool:
+        """True if a frame is waiting to be taken."""
+        with self._condition:
+            return self._frame is not None
+
+    def take(self, timeout: Optional[float] = None) -> Tuple[Optional[np.ndarray], float]:
+        """
+        Wait for and remove the newest frame.
+
+        Args:
+            timeout: Maximum seconds to wait
+
+        Returns:
+            Tuple of (frame, capture timestamp); frame is None on timeout or close
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._frame is not None or self.closed, timeout)
+            frame, timestamp = self._frame, self._timestamp
+            self._frame = None
+            return frame, timestamp
+
+    def close(self):
+        """Wake any waiting worker and stop accepting frames."""
+        with self._condition:
+            self.closed = True
+            self._frame = None
+            self._condition.notify_all()
@@ -19,16 +19,65 @@ class Config:
     # Webcam Settings
     CAMERA_INDEX = int(os.getenv('CAMERA_INDEX', 1))
     CAMERA_FALLBACK_INDEX = int(os.getenv('CAMERA_FALLBACK_INDEX', 1))
+    # Capture backend: auto (DirectShow on Windows, V4L2 on Linux), dshow, msmf, v4l2, avfoundation, any
+    CAMERA_BACKEND = os.getenv('CAMERA_BACKEND', 'auto').lower()
+    # Requested capture format; 0 keeps the driver default
+    CAMERA_WIDTH = int(os.getenv('CAMERA_WIDTH', 0))
+    CAMERA_HEIGHT = int(os.getenv('CAMERA_HEIGHT', 0))
+    CAMERA_FPS = float(os.getenv('CAMERA_FPS', 0))
+    # Low-latency capture: one-frame driver buffer, and frames that will not be
+    # analysed are only grab()bed, never retrieved and converted
+    LOW_LATENCY_CAPTURE = os.getenv('LOW_LATENCY_CAPTURE', 'False').lower() == 'true'
     
     # Streaming Settings (for OBS method)
     USE_STREAM = os.getenv('USE_STREAM', 'False').lower() == 'true'
     STREAM_URL = os.getenv('STREAM_URL', 'http://localhost:8080/stream.mjpg')
     STREAM_TYPE = os.getenv('STREAM_TYPE', 'mjpeg')  # mjpeg, rtsp, rtmp
+    STREAM_TIMEOUT = float(os.getenv('STREAM_TIMEOUT', 10))  # seconds to connect or read
+    # Ingest HTTP MJPEG streams as raw JPEG: viewers get the original bytes and only
+    # analysed frames are decoded, downscaled while decoding by 1, 2, 4 or 8
+    MJPEG_PASSTHROUGH = os.getenv('MJPEG_PASSTHROUGH', 'False').lower() == 'true'
+    MJPEG_DECODE_SCALE = int(os.getenv('MJPEG_DECODE_SCALE', 1))
+    # Hot standby: camera index or stream URL kept open and switched to while the
+    # primary source is down; the primary is reopened in the background with backoff
+    STANDBY_SOURCE = os.getenv('STANDBY_SOURCE', '')
+    RECONNECT_INITIAL_DELAY = float(os.getenv('RECONNECT_INITIAL_DELAY', 0.5))
+    RECONNECT_MAX_DELAY = float(os.getenv('RECONNECT_MAX_DELAY', 30))
 
     # Model Settings
     MODEL_PATH = os.getenv('MODEL_PATH', 'models/emotion_model_trained.h5')
     DATA_PATH = os.getenv('DATA_PATH', 'data/fer2013.csv')
     SHAPE_PREDICTOR_PATH = os.getenv('SHAPE_PREDICTOR_PATH', 'models/shape_predictor_68_face_landmarks.dat')
+    # Emotion backend: "fer" (FER library), "cnn" (trained model at MODEL_PATH in Keras)
+    # or "numpy" (same model as a NumPy forward pass, no TensorFlow); both CNN modes are batched
+    EMOTION_BACKEND = os.getenv('EMOTION_BACKEND', 'fer').lower()
+    # A batch holds at most one face per thread classifying at the same time, i.e.
+    # INFERENCE_WORKERS in fleet mode and 1 for a single stream; the wait is skipped
+    # when no other thread can add a face
+    EMOTION_BATCH_SIZE = int(os.getenv('EMOTION_BATCH_SIZE', 8))
+    EMOTION_BATCH_WAIT_MS = float(os.getenv('EMOTION_BATCH_WAIT_MS', 10))
+    # Emotion classifications per second; landmarks and eye closure still run on every
+    # analysed frame and reuse the latest emotion in between (0 = classify every frame)
+    EMOTION_FPS = float(os.getenv('EMOTION_FPS', 0))
+
+    # Fleet mode: comma separated "id=source" entries (stream URL or camera index)
+    # served by one process with a shared pool of inference workers
+    FLEET_STREAMS = os.getenv('FLEET_STREAMS', '')
+    INFERENCE_WORKERS = int(os.getenv('INFERENCE_WORKERS', 2))
+    # Inference backend: "thread" (in the server process) or "process" (worker
+    # processes fed through shared memory, off the server's GIL)
+    INFERENCE_BACKEND = os.getenv('INFERENCE_BACKEND', 'thread').lower()
+    INFERENCE_PROCESSES = int(os.getenv('INFERENCE_PROCESSES', 2))
+
+    # Frame bus for multi-worker deployments: "publisher" (the one analysis process,
+    # see frame_bus.py), "reader" (HTTP workers serving its frames) or empty to disable
+    FRAME_BUS_ROLE = os.getenv('FRAME_BUS_ROLE', '').lower()
+    FRAME_BUS_PREFIX = os.getenv('FRAME_BUS_PREFIX', 'safedrive')
+    FRAME_BUS_SIZE = int(os.getenv('FRAME_BUS_SIZE', 4 * 1024 * 1024))  # bytes per stream
+    FRAME_BUS_POLL_MS = float(os.getenv('FRAME_BUS_POLL_MS', 5))
+
+    # Load and warm up models in the background at server boot (see /api/ready)
+    PRELOAD_MODELS = os.getenv('PRELOAD_MODELS', 'True').lower() == 'true'
 
     # Logging Settings
     LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
@@ -38,6 +87,29 @@ class Config:
     # Performance Settings
     MAX_FPS = int(os.getenv('MAX_FPS', 30))
     FRAME_SKIP = int(os.getenv('FRAME_SKIP', 1))
+    JPEG_QUALITY = int(os.getenv('JPEG_QUALITY', 90))
+    # Adaptive mode replaces FRAME_SKIP with a rate derived from measured inference time
+    ADAPTIVE_FRAME_SKIP = os.getenv('ADAPTIVE_FRAME_SKIP', 'False').lower() == 'true'
+    INFERENCE_CPU_BUDGET = float(os.getenv('INFERENCE_CPU_BUDGET', 0.5))  # share of one core
+    MIN_ANALYSIS_FPS = float(os.getenv('MIN_ANALYSIS_FPS', 1))
+    # Face tracking: full detection every N analysed frames or when tracking confidence drops
+    FACE_TRACKING = os.getenv('FACE_TRACKING', 'False').lower() == 'true'
+    DETECTION_INTERVAL = int(os.getenv('DETECTION_INTERVAL', 10))
+    TRACKING_MIN_CONFIDENCE = float(os.getenv('TRACKING_MIN_CONFIDENCE', 7.0))
+    # Face detection runs on a frame downscaled by this factor (1.0 = full resolution).
+    # The HOG detector needs faces of ~80px at the detection scale.
+    DETECTION_SCALE = float(os.getenv('DETECTION_SCALE', 1.0))
+    # Driver-seat ROI: "x,y,w,h" to set manually, otherwise calibrated from the first detections
+    DRIVER_ROI_ENABLED = os.getenv('DRIVER_ROI_ENABLED', 'False').lower() == 'true'
+    DRIVER_ROI = os.getenv('DRIVER_ROI', '')
+    ROI_CALIBRATION_FRAMES = int(os.getenv('ROI_CALIBRATION_FRAMES', 30))
+    ROI_DIR = os.getenv('ROI_DIR', 'calibration')
+    # Change gating: reuse the last result while the face region differs from the last
+    # analysed frame by less than the threshold (mean absolute difference, 0-255);
+    # a fresh analysis is forced after MOTION_GATE_MAX_REUSE reused frames
+    MOTION_GATE = os.getenv('MOTION_GATE', 'False').lower() == 'true'
+    MOTION_GATE_THRESHOLD = float(os.getenv('MOTION_GATE_THRESHOLD', 3.0))
+    MOTION_GATE_MAX_REUSE = int(os.getenv('MOTION_GATE_MAX_REUSE', 5))
 
     @classmethod
     def validate_config(cls):
@@ -0,0 +1,266 @@
+"""
+Emotion classifiers for known face boxes.
+
+FaceAnalyzer locates the face itself, so a classifier only has to turn a
+face box into emotion scores. Two backends are available:
+
+- FERClassifier wraps the FER library and classifies one face per call.
+- CNNEmotionClassifier runs the model trained by models/train_model.py and
+  sends its crops through an EmotionBatcher, which gathers faces from
+  several frames or streams within a short window into one forward pass.
+  The model runs either in Keras or, without importing TensorFlow, as the
+  vectorised NumPy forward pass in NumpyEmotionCNN.
+"""
+
+import queue
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from logger import logger
+
+# Output order of the FER2013-trained CNN
+EMOTION_LABELS = ['angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral']
+
+# Input size of create_emotion_model
+FACE_SIZE = 48
+
+
+def preprocess_face(frame: np.ndarray, box: Tuple[int, int, int, int]) -> np.ndarray:
+    """
+    Crop and normalise a face the same way the training data was prepared.
+
+    Args:
+        frame: BGR or grayscale frame
+        box: Face box as (x, y, width, height)
+
+    Returns:
+        Float32 array of shape (48, 48, 1) scaled to [0, 1]
+    """
+    x, y, w, h = box
+    face = frame[y:y + h, x:x + w]
+    if face.ndim == 3:
+        face = cv2.cvtColor(face, cv2.COLOR_BGR2GRAY)
+    face = cv2.resize(face, (FACE_SIZE, FACE_SIZE), interpolation=cv2.INTER_AREA)
+    return (face.astype(np.float32) / 255.0)[..., np.newaxis]
+
+
+class FERClassifier:
+    """Classifies a known face box with the FER library, one face per call."""
+
+    def __init__(self, fer):
+        self.fer = fer
+
+    def classify(self, frame: np.ndarray, box: Tuple[int, int, int, int]) -> Optional[dict]:
+        """Return emotion scores for the face in box, or None."""
+        results = self.fer.detect_emotions(frame, face_rectangles=[box])
+        if not results:
+            return None
+        return results[0]['emotions']
+
+
+class _BatchRequest:
+    def __init__(self, face: np.ndarray):
+        self.face = face
+        self.scores = None
+        self.error = None
+        self.done = threading.Event()
+
+
+class EmotionBatcher:
+    """Runs face crops submitted by many threads as batched forward passes."""
+
+    def __init__(self, predict: Callable[[np.ndarray], np.ndarray], max_batch: int = 8, max_wait: float = 0.01):
+        """
+        Args:
+            predict: Maps an (N, 48, 48, 1) array to (N, 7) class probabilities
+            max_batch: Largest number of faces per forward pass
+            max_wait: Seconds to wait for more faces after the first one arrives, as
+                long as other threads are still classifying
+        """
+        self.predict = predict
+        self.max_batch = max(max_batch, 1)
+        self.max_wait = max_wait
+        self.batches = 0
+        self.faces = 0
+        # Threads inside submit(); each can add at most one face to a batch
+        self._active = 0
+        self._active_lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="emotion-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, face: np.ndarray) -> np.ndarray:
+        """
+        Classify one preprocessed face, blocking until its batch has run.
+
+        Args:
+            face: Array of shape (48, 48, 1)
+
+        Returns:
+            Class probabilities in EMOTION_LABELS order
+        """
+        request = _BatchRequest(face)
+        with self._active_lock:
+            self._active += 1
+        try:
+            self._queue.put(request)
+            request.done.wait()
+        finally:
+            with self._active_lock:
+                self._active -= 1
+        if request.error is not None:
+            raise request.error
+        return request.scores
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        # Waiting for faces nobody can submit would only add latency, e.g. with a
+        # single stream whose pipeline classifies one frame at a time
+        while len(batch) < min(self.max_batch, self._active):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                scores = self.predict(np.stack([request.face for request in batch]))
+                for request, row in zip(batch, scores):
+                    request.scores = row
+            except Exception as e:
+                logger.warning(f"Batched emotion inference failed: {e}")
+                for request in batch:
+                    request.error = e
+            self.batches += 1
+            self.faces += len(batch)
+            for request in batch:
+                request.done.set()
+
+    def stats(self) -> dict:
+        """Get batch counters."""
+        average = self.faces / self.batches if self.batches else 0.0
+        return {'emotion_batches': self.batches, 'emotion_avg_batch_size': round(average, 2)}
+
+
+class CNNEmotionClassifier:
+    """Classifies faces with the trained CNN through a shared batcher."""
+
+    def __init__(self, batcher: EmotionBatcher):
+        self.batcher = batcher
+
+    def classify(self, frame: np.ndarray, box: Tuple[int, int, int, int]) -> Optional[dict]:
+        """Return emotion scores for the face in box."""
+        scores = self.batcher.submit(preprocess_face(frame, box))
+        return {label: float(score) for label, score in zip(EMOTION_LABELS, scores)}
+
+
+def load_keras_predict(model_path: str) -> Callable[[np.ndarray], np.ndarray]:
+    """
+    Load the trained Keras model and return its batch predict function.
+
+    Args:
+        model_path: Path to the saved .h5 model
+
+    Returns:
+        Callable mapping a face batch to class probabilities
+    """
+    from tensorflow.keras.models import load_model
+
+    model = load_model(model_path, compile=False)
+    logger.info(f"Loaded emotion model from {model_path}")
+    return lambda batch: np.asarray(model.predict_on_batch(batch))
+
+
+def _conv2d_relu(x: np.ndarray, kernel: np.ndarray, bias: np.ndarray) -> np.ndarray:
+    """Valid 2D convolution with ReLU on an NHWC batch, as an im2col matmul."""
+    kh, kw, channels, filters = kernel.shape
+    windows = np.lib.stride_tricks.sliding_window_view(x, (kh, kw), axis=(1, 2))
+    n, out_h, out_w = windows.shape[:3]
+    # (N, H', W', C, kh, kw) -> (N*H'*W', kh*kw*C) in the kernel's (kh, kw, C) order
+    patches = windows.transpose(0, 1, 2, 4, 5, 3).reshape(-1, kh * kw * channels)
+    out = patches @ kernel.reshape(-1, filters) + bias
+    return np.maximum(out, 0.0).reshape(n, out_h, out_w, filters)
+
+
+def _max_pool2(x: np.ndarray) -> np.ndarray:
+    """2x2 max pooling with stride 2 and valid padding on an NHWC batch."""
+    n, h, w, c = x.shape
+    x = x[:, :h // 2 * 2, :w // 2 * 2]
+    return x.reshape(n, h // 2, 2, w // 2, 2, c).max(axis=(2, 4))
+
+
+class NumpyEmotionCNN:
+    """
+    NumPy forward pass of create_emotion_model.
+
+    Three Conv2D(3x3, ReLU)/MaxPool(2x2) blocks, Flatten, Dense(128, ReLU)
+    and Dense(7, softmax). Dropout is inactive at inference time.
+    """
+
+    def __init__(self, weights):
+        """
+        Args:
+            weights: Layer weights in model order: (kernel, bias) for the three
+                convolutions followed by the two dense layers
+        """
+        weights = [np.asarray(w, dtype=np.float32) for w in weights]
+        if len(weights) != 10:
+            raise ValueError(f"Expected 10 weight arrays, got {len(weights)}")
+        self.convs = [(weights[i], weights[i + 1]) for i in (0, 2, 4)]
+        self.dense = [(weights[i], weights[i + 1]) for i in (6, 8)]
+
+    @classmethod
+    def load(cls, model_path: str) -> 'NumpyEmotionCNN':
+        """
+        Read the weights from a Keras .h5 file without importing TensorFlow.
+
+        Args:
+            model_path: Path to the saved .h5 model
+
+        Returns:
+            NumpyEmotionCNN with the stored weights
+        """
+        import h5py
+
+        weights = []
+        with h5py.File(model_path, 'r') as f:
+            group = f['model_weights'] if 'model_weights' in f else f
+            for layer_name in group.attrs['layer_names']:
+                layer = group[layer_name]
+                for weight_name in layer.attrs['weight_names']:
+                    weights.append(layer[weight_name][()])
+        logger.info(f"Loaded emotion model weights from {model_path}")
+        return cls(weights)
+
+    def __call__(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Classify a batch of faces.
+
+        Args:
+            batch: Array of shape (N, 48, 48, 1) scaled to [0, 1]
+
+        Returns:
+            Array of shape (N, 7) with class probabilities
+        """
+        x = batch.astype(np.float32, copy=False)
+        for kernel, bias in self.convs:
+            x = _max_pool2(_conv2d_relu(x, kernel, bias))
+
+        x = x.reshape(len(x), -1)
+        (w1, b1), (w2, b2) = self.dense
+        x = np.maximum(x @ w1 + b1, 0.0)
+        logits = x @ w2 + b2
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
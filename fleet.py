@@ -0,0 +1,110 @@
+"""
+Shared inference worker pool for fleet mode.
+
+One server monitors many vehicles. Every stream keeps its own capture thread
+and latest-frame slot, but inference runs on a fixed pool of workers that
+share a single copy of the models. A stream is queued when a new frame
+arrives and is never scheduled on two workers at once, so per-stream state
+(tracker, ROI, eye-closure timing) needs no extra locking.
+"""
+
+import queue
+import threading
+from typing import Dict, List, Tuple
+
+from logger import logger
+
+
+def parse_fleet_streams(value: str) -> List[Tuple[str, str]]:
+    """
+    Parse the FLEET_STREAMS setting.
+
+    Args:
+        value: Comma separated "id=source" entries, where source is a stream
+            URL or a camera index
+
+    Returns:
+        List of (stream_id, source) tuples
+    """
+    streams = []
+    for entry in value.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        stream_id, sep, source = entry.partition('=')
+        if not sep or not stream_id.strip() or not source.strip():
+            logger.warning(f"Ignoring invalid fleet stream entry: {entry}")
+            continue
+        streams.append((stream_id.strip(), source.strip()))
+    return streams
+
+
+class InferencePool:
+    """Fixed set of worker threads serving the newest frame of each stream."""
+
+    def __init__(self, workers: int = 2):
+        self.workers = max(workers, 1)
+        self._queue = queue.Queue()
+        self._scheduled = set()
+        self._lock = threading.Lock()
+        self._threads = []
+        self.running = False
+
+    def start(self):
+        """Start the worker threads."""
+        if self.running:
+            return
+        self.running = True
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"inference-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info(f"Inference pool started with {self.workers} workers")
+
+    def stop(self):
+        """Stop the worker threads once they finish their current frame."""
+        self.running = False
+        for _ in self._threads:
+            self._queue.put(None)
+        self._threads = []
+
+    def attach(self, handler):
+        """
+        Route a stream's published frames to this pool.
+
+        Args:
+            handler: Object with a frame_slot and a handle_frame(frame, timestamp) method
+        """
+        handler.frame_slot.listener = lambda: self.schedule(handler)
+
+    def schedule(self, handler):
+        """Queue a stream unless it is already queued or being processed."""
+        with self._lock:
+            if handler in self._scheduled:
+                return
+            self._scheduled.add(handler)
+        self._queue.put(handler)
+
+    def _work(self):
+        while self.running:
+            handler = self._queue.get()
+            if handler is None:
+                break
+
+            try:
+                frame, captured_at = handler.frame_slot.take(timeout=0)
+                if frame is not None and handler.running:
+                    handler.handle_frame(frame, captured_at)
+            except Exception as e:
+                logger.error(f"Inference failed for stream {handler.stream_id}: {e}")
+            finally:
+                with self._lock:
+                    self._scheduled.discard(handler)
+
+            # A newer frame may have arrived while this one was processed
+            if handler.frame_slot.pending:
+                self.schedule(handler)
+
+    def stats(self) -> Dict[str, int]:
+        """Get pool size and backlog."""
+        return {'workers': self.workers, 'queued': self._queue.qsize()}
@@ -0,0 +1,398 @@
+"""
+Shared-memory frame bus for multi-worker deployments.
+
+Under a pre-forking WSGI server every worker process imports app.py and
+would open the same camera. With the frame bus, one analysis process
+captures and analyses each stream and publishes the encoded JPEG and the
+status into a named shared memory block per stream; HTTP worker processes
+only read those blocks. Inference runs once per stream while serving scales
+across cores, and no worker re-encodes a frame.
+
+Each block is a seqlock: the writer makes the counter odd, writes the data
+and every other header field, and only then stores the even counter. A
+reader retries if the counter was odd or changed while it was copying.
+
+The publisher also stamps a heartbeat into the header outside the seqlock.
+A publisher that crashes stops the heartbeat without ever marking itself
+stopped, so readers treat a heartbeat that stops advancing as the stream
+being down: they mark the status stale and reopen the block by name until
+a restarted publisher's block (a new generation) appears.
+
+Status sequence numbers and frame identities are the publisher's, tagged
+with its generation, so every HTTP worker reports the same values.
+
+Block layout:
+
+    header (64 bytes) | status JSON (STATUS_CAPACITY bytes) | JPEG bytes
+
+Run the analysis process with FRAME_BUS_ROLE=publisher:
+    python frame_bus.py
+and the HTTP workers with FRAME_BUS_ROLE=reader, e.g.:
+    gunicorn -w 4 -k gthread --threads 16 app:app
+"""
+
+import json
+import os
+import struct
+import threading
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Optional
+
+from logger import logger
+
+# The lock counter comes first; the remaining header fields follow it:
+# generation, frame seq, status seq, timestamp, JPEG length, status length, running
+_COUNTER = struct.Struct('<Q')
+_FIELDS = struct.Struct('<QQQdIII')
+# Publisher wall-clock time, rewritten every HEARTBEAT_INTERVAL seconds
+_HEARTBEAT = struct.Struct('<d')
+HEARTBEAT_OFFSET = 56
+HEADER_SIZE = 64
+STATUS_CAPACITY = 4096
+HEARTBEAT_INTERVAL = 0.5
+# Seconds without a heartbeat after which readers consider the publisher gone
+HEARTBEAT_TIMEOUT = 2.0
+
+
+def block_name(prefix: str, stream_id: str) -> str:
+    """Name of a stream's shared memory block."""
+    return f"{prefix}_{stream_id}"
+
+
+class BusSnapshot:
+    """A consistent copy of one stream's published state."""
+
+    def __init__(self, counter: int, generation: int, frame_seq: int, status_seq: int, timestamp: float,
+                 jpeg: Optional[bytes], status: dict, running: bool):
+        self.counter = counter
+        self.generation = generation
+        self.frame_seq = frame_seq
+        self.status_seq = status_seq
+        self.timestamp = timestamp
+        self.jpeg = jpeg
+        self.status = status
+        self.running = running
+
+
+class FrameBusWriter:
+    """Publishes one stream's latest JPEG and status; one writer per stream."""
+
+    def __init__(self, prefix: str, stream_id: str, size: int):
+        """
+        Args:
+            prefix: Block name prefix shared by publisher and readers
+            stream_id: Stream the block belongs to
+            size: Total block size in bytes; larger JPEGs are not published
+        """
+        name = block_name(prefix, stream_id)
+        try:
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            # Left behind by a publisher that did not shut down cleanly
+            stale = shared_memory.SharedMemory(name=name)
+            stale.close()
+            stale.unlink()
+            self.shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.stream_id = stream_id
+        # Lets readers tell a restarted publisher's block from the old one
+        self.generation = int.from_bytes(os.urandom(8), 'little')
+        self.jpeg_capacity = self.shm.size - HEADER_SIZE - STATUS_CAPACITY
+        self._lock_counter = 0
+        self._frame_seq = 0
+        self._status_seq = 0
+        self._timestamp = 0.0
+        self._jpeg_len = 0
+        self._status_len = 0
+        self._status = {}
+        self._running = False
+        self.dropped = 0
+        # Serialises publishers, e.g. the inference thread and a status change
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._heartbeat_thread = None
+        self._write_header()
+        self.beat()
+
+    def _write_header(self):
+        # Fields first, the counter last: a reader that sees the even counter
+        # also sees the fields and data written before it
+        _FIELDS.pack_into(
+            self.shm.buf, _COUNTER.size, self.generation, self._frame_seq, self._status_seq,
+            self._timestamp, self._jpeg_len, self._status_len, int(self._running)
+        )
+        _COUNTER.pack_into(self.shm.buf, 0, self._lock_counter)
+
+    def publish(self, encoded, status_seq: int, status: dict, running: bool = True):
+        """
+        Publish a frame and the status it was analysed with.
+
+        Args:
+            encoded: EncodedFrame from the stream's FrameCache, or None to
+                only update the status
+            status_seq: Sequence number of status
+            status: Driver status
+            running: Whether the stream is capturing
+        """
+        status_bytes = json.dumps(status).encode('utf-8')
+        if len(status_bytes) > STATUS_CAPACITY:
+            logger.warning(f"Status of stream {self.stream_id} too large for the frame bus")
+            return
+        if encoded is not None and len(encoded.jpeg) > self.jpeg_capacity:
+            self.dropped += 1
+            logger.warning(f"Frame of {len(encoded.jpeg)} bytes exceeds FRAME_BUS_SIZE, dropped")
+            encoded = None
+
+        buf = self.shm.buf
+        with self._lock:
+            self._lock_counter += 1  # odd: write in progress
+            _COUNTER.pack_into(buf, 0, self._lock_counter)
+
+            buf[HEADER_SIZE:HEADER_SIZE + len(status_bytes)] = status_bytes
+            self._status_seq, self._status, self._status_len = status_seq, status, len(status_bytes)
+            if encoded is not None:
+                start = HEADER_SIZE + STATUS_CAPACITY
+                buf[start:start + len(encoded.jpeg)] = encoded.jpeg
+                self._frame_seq, self._timestamp, self._jpeg_len = encoded.seq, encoded.timestamp, len(encoded.jpeg)
+            self._running = running
+
+            self._lock_counter += 1  # even: consistent again
+            self._write_header()
+
+    def beat(self):
+        """Stamp the current time as the publisher's heartbeat."""
+        _HEARTBEAT.pack_into(self.shm.buf, HEARTBEAT_OFFSET, time.time())
+
+    def start_heartbeat(self, interval: float = HEARTBEAT_INTERVAL):
+        """Keep stamping the heartbeat in a background thread until close()."""
+        def run():
+            while not self._closed.wait(interval):
+                self.beat()
+
+        self._heartbeat_thread = threading.Thread(target=run, name=f"frame-bus-beat-{self.stream_id}", daemon=True)
+        self._heartbeat_thread.start()
+
+    def set_running(self, running: bool):
+        """Update only the running flag, e.g. when the stream stops."""
+        self.publish(None, self._status_seq, self._status, running)
+
+    def close(self):
+        """Mark the stream stopped and remove the block."""
+        self._closed.set()
+        if self._heartbeat_thread is not None:
+            self._heartbeat_thread.join()
+        self.set_running(False)
+        self.shm.close()
+        self.shm.unlink()
+
+
+class FrameBusReader:
+    """Reads one stream's block written by the analysis process."""
+
+    def __init__(self, prefix: str, stream_id: str):
+        self.name = block_name(prefix, stream_id)
+        self.shm = None
+
+    def _attach(self) -> bool:
+        if self.shm is not None:
+            return True
+        try:
+            self.shm = shared_memory.SharedMemory(name=self.name)
+        except FileNotFoundError:
+            return False
+        # Readers must not unlink the publisher's block when they exit
+        resource_tracker.unregister(self.shm._name, 'shared_memory')
+        return True
+
+    def read(self, previous: Optional[BusSnapshot] = None) -> Optional[BusSnapshot]:
+        """
+        Read the block if it changed.
+
+        Args:
+            previous: Last snapshot the reader got, if any
+
+        Returns:
+            BusSnapshot, or None if the block is missing or unchanged. Its
+            jpeg is None when the frame is the same as in previous.
+        """
+        if not self._attach():
+            return None
+        buf = self.shm.buf
+        for _ in range(10):
+            counter = _COUNTER.unpack_from(buf, 0)[0]
+            if counter % 2:
+                time.sleep(0.0005)
+                continue
+            generation, frame_seq, status_seq, timestamp, jpeg_len, status_len, running = \
+                _FIELDS.unpack_from(buf, _COUNTER.size)
+            same_block = previous is not None and generation == previous.generation
+            if same_block and counter == previous.counter:
+                return None
+            status = bytes(buf[HEADER_SIZE:HEADER_SIZE + status_len])
+            jpeg = None
+            if jpeg_len and not (same_block and frame_seq == previous.frame_seq):
+                start = HEADER_SIZE + STATUS_CAPACITY
+                jpeg = bytes(buf[start:start + jpeg_len])
+            if _COUNTER.unpack_from(buf, 0)[0] == counter:
+                return BusSnapshot(counter, generation, frame_seq, status_seq, timestamp, jpeg,
+                                   json.loads(status) if status else {}, bool(running))
+        return None
+
+    def heartbeat(self) -> Optional[float]:
+        """Get the publisher's last heartbeat, or None if the block is not attached."""
+        if self.shm is None:
+            return None
+        return _HEARTBEAT.unpack_from(self.shm.buf, HEARTBEAT_OFFSET)[0]
+
+    def close(self):
+        if self.shm is not None:
+            self.shm.close()
+            self.shm = None
+
+
+def publish_to_bus(handler, prefix: str, size: int) -> FrameBusWriter:
+    """
+    Publish every frame a handler encodes, together with its current status,
+    and every status change as soon as it is made.
+
+    Args:
+        handler: VideoStreamHandler running in the analysis process
+        prefix: Block name prefix
+        size: Block size in bytes
+
+    Returns:
+        The stream's FrameBusWriter
+    """
+    writer = FrameBusWriter(prefix, handler.stream_id, size)
+    writer.start_heartbeat()
+
+    def on_publish(encoded):
+        with handler.status_lock:
+            seq, status = handler.status_seq, handler.status_data
+        writer.publish(encoded, seq, status, handler.running)
+
+    def on_status():
+        # Analysis result or source switch: keep the current frame
+        with handler.status_lock:
+            seq, status = handler.status_seq, handler.status_data
+        writer.publish(None, seq, status, handler.running)
+
+    handler.frame_cache.listeners.append(on_publish)
+    handler.status_listeners.append(on_status)
+    return writer
+
+
+def mirror_from_bus(handler, prefix: str, poll_interval: float, heartbeat_timeout: float = HEARTBEAT_TIMEOUT,
+                    stop: Optional[threading.Event] = None) -> threading.Thread:
+    """
+    Copy a stream's published state into a handler of an HTTP worker.
+
+    Each new JPEG is copied out of shared memory once per worker and then
+    shared by all of that worker's connections through the handler's
+    FrameCache, so every existing endpoint works unchanged. The handler
+    takes over the publisher's status sequence and generation, so all
+    workers hand out the same sequence numbers and ETags.
+
+    Args:
+        handler: VideoStreamHandler that does not capture itself
+        prefix: Block name prefix
+        poll_interval: Seconds between checks for a new frame
+        heartbeat_timeout: Seconds without a publisher heartbeat before the
+            stream is marked down and the block is reopened
+        stop: Optional event that ends the mirror thread
+
+    Returns:
+        The started mirror thread
+    """
+    reader = FrameBusReader(prefix, handler.stream_id)
+    stop = stop or threading.Event()
+
+    def notify_status():
+        # A dead publisher sends no more frames, so frame listeners alone would never see this
+        for listener in handler.status_listeners:
+            listener()
+
+    def mark_down(previous):
+        with handler.status_lock:
+            handler.running = False
+            if previous is not None:
+                # Same for every worker, and distinct from the live status
+                handler.status_epoch = f"{previous.generation:x}-down"
+            handler.status_data = dict(handler.status_data, stale=True)
+            handler.status_changed.notify_all()
+        notify_status()
+
+    def mirror():
+        previous = None
+        last_beat, beat_seen_at = None, time.monotonic()
+        down = False
+        reattached_at = 0.0
+        while not stop.is_set():
+            # While down, any block whose heartbeat advances again is read in full
+            snapshot = reader.read(None if down else previous)
+            beat = reader.heartbeat()
+            now = time.monotonic()
+            beating = beat is not None and beat != last_beat
+            if beating:
+                last_beat, beat_seen_at = beat, now
+            elif now - beat_seen_at > heartbeat_timeout:
+                if not down and previous is not None:
+                    logger.warning(f"Frame bus publisher of stream {handler.stream_id} stopped responding")
+                    mark_down(previous)
+                    down = True
+                if now - reattached_at > 1.0:
+                    # A restarted publisher creates a new block under the same name
+                    reader.close()
+                    reattached_at = now
+            if snapshot is None or (down and not beating):
+                # The orphaned block of a crashed publisher is never served as live
+                stop.wait(poll_interval)
+                continue
+
+            epoch = f"{snapshot.generation:x}"
+            # Status goes first, so a frame is never served next to an older status
+            with handler.status_lock:
+                changed = down or handler.status_epoch != epoch or handler.status_seq != snapshot.status_seq
+                changed = changed or handler.running != snapshot.running
+                handler.running = snapshot.running
+                if changed:
+                    handler.status_epoch = epoch
+                    handler.status_seq = snapshot.status_seq
+                    handler.status_data = snapshot.status
+                handler.status_changed.notify_all()
+            if changed:
+                notify_status()
+            if snapshot.jpeg is not None:
+                handler.frame_cache.publish_jpeg(
+                    snapshot.jpeg, snapshot.timestamp, tag=f"{epoch}-{snapshot.frame_seq}"
+                )
+            down = False
+            previous = snapshot
+            handler.bus_attached = True
+
+    thread = threading.Thread(target=mirror, name=f"frame-bus-{handler.stream_id}", daemon=True)
+    thread.start()
+    return thread
+
+
+def run_publisher():
+    """Start every configured stream in this process and publish it to the bus."""
+    import app as api
+
+    for stream_id, handler in api.video_handlers.items():
+        if not api.start_handler(handler):
+            logger.error(f"Failed to start stream {stream_id}")
+    logger.info(f"Publishing {len(api.video_handlers)} streams to the frame bus")
+    try:
+        while any(handler.running for handler in api.video_handlers.values()):
+            time.sleep(1.0)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for handler in api.video_handlers.values():
+            handler.cleanup()
+            handler.bus_writer.close()
+
+
+if __name__ == '__main__':
+    run_publisher()
@@ -0,0 +1,102 @@
+"""
+Encode-once JPEG cache for published frames.
+
+Every new frame is JPEG-encoded exactly once, outside any lock, and stored
+with a monotonically increasing sequence number. All HTTP readers share the
+same encoded bytes (and base64 text) instead of re-encoding per request.
+"""
+
+import base64
+import threading
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+class EncodedFrame:
+    """A published frame as JPEG bytes plus its sequence number."""
+
+    def __init__(self, seq: int, jpeg: bytes, timestamp: float, tag: Optional[str] = None):
+        self.seq = seq
+        self.jpeg = jpeg
+        self.timestamp = timestamp
+        # Identity shared by processes serving the same frame, e.g. from the frame bus
+        self.tag = tag
+        self._base64 = None
+
+    @property
+    def base64(self) -> str:
+        """Base64 text of the JPEG, computed on first use and then shared."""
+        if self._base64 is None:
+            self._base64 = base64.b64encode(self.jpeg).decode('utf-8')
+        return self._base64
+
+
+class FrameCache:
+    """Holds the newest encoded frame and wakes readers when it changes."""
+
+    def __init__(self, quality: int = 90):
+        self.quality = quality
+        self._condition = threading.Condition()
+        self._latest: Optional[EncodedFrame] = None
+        self._seq = 0
+        # Callables invoked with each new EncodedFrame, from the publishing thread
+        self.listeners = []
+
+    def publish(self, frame: np.ndarray) -> Optional[EncodedFrame]:
+        """
+        Encode a frame once and make it the latest.
+
+        Args:
+            frame: BGR frame
+
+        Returns:
+            The stored EncodedFrame, or None if encoding failed
+        """
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            return None
+        return self.publish_jpeg(buffer.tobytes())
+
+    def publish_jpeg(self, jpeg: bytes, timestamp: Optional[float] = None, tag: Optional[str] = None) -> EncodedFrame:
+        """
+        Store already encoded JPEG bytes as the latest frame.
+
+        Args:
+            jpeg: JPEG bytes
+            timestamp: Capture time, defaults to now
+            tag: Identity of the frame across processes, if it has one
+
+        Returns:
+            The stored EncodedFrame
+        """
+        with self._condition:
+            self._seq += 1
+            encoded = EncodedFrame(self._seq, jpeg, time.time() if timestamp is None else timestamp, tag)
+            self._latest = encoded
+            self._condition.notify_all()
+        for listener in self.listeners:
+            listener(encoded)
+        return encoded
+
+    def latest(self) -> Optional[EncodedFrame]:
+        """Get the newest encoded frame without waiting."""
+        return self._latest
+
+    def wait_newer(self, seq: int, timeout: Optional[float] = None) -> Optional[EncodedFrame]:
+        """
+        Wait for a frame newer than seq.
+
+        Args:
+            seq: Sequence number the reader already has
+            timeout: Maximum seconds to wait
+
+        Returns:
+            The newest frame if it is newer than seq, otherwise None
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._seq > seq, timeout)
+            latest = self._latest
+        return latest if latest is not None and latest.seq > seq else None
@@ -2,6 +2,12 @@ import React, { useState, useEffect, useRef } from 'react';
 import axios from 'axios';
 import './App.css';
 
+// WebSocket reconnection: delays double from the base up to the maximum, and
+// after MAX_SOCKET_RETRIES failed attempts the HTTP feeds take over
+const SOCKET_RETRY_BASE_MS = 500;
+const SOCKET_RETRY_MAX_MS = 8000;
+const MAX_SOCKET_RETRIES = 5;
+
 function App() {
   const [isStreaming, setIsStreaming] = useState(false);
   const [driverStatus, setDriverStatus] = useState({
@@ -11,24 +17,122 @@ function App() {
   });
   const [error, setError] = useState(null);
   const videoRef = useRef(null);
+  const frameUrlRef = useRef(null);
+  const socketRef = useRef(null);
   const intervalRef = useRef(null);
-  const statusIntervalRef = useRef(null);
+  const statusSourceRef = useRef(null);
+  const reconnectTimerRef = useRef(null);
+  const socketRetriesRef = useRef(0);
+  const socketOpenedRef = useRef(false);
 
   // Use environment variable for API URL, fallback to localhost for development
   const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:5000/api';
+  const WS_URL = API_URL.replace(/^http/, 'ws');
+
+  const closeChannels = () => {
+    if (reconnectTimerRef.current) {
+      clearTimeout(reconnectTimerRef.current);
+      reconnectTimerRef.current = null;
+    }
+    if (socketRef.current) {
+      socketRef.current.onclose = null;
+      socketRef.current.close();
+      socketRef.current = null;
+    }
+    if (intervalRef.current) {
+      clearInterval(intervalRef.current);
+      intervalRef.current = null;
+    }
+    if (statusSourceRef.current) {
+      statusSourceRef.current.close();
+      statusSourceRef.current = null;
+    }
+    if (frameUrlRef.current) {
+      URL.revokeObjectURL(frameUrlRef.current);
+      frameUrlRef.current = null;
+    }
+  };
 
   useEffect(() => {
     // Cleanup on unmount
     return () => {
+      if (reconnectTimerRef.current) {
+        clearTimeout(reconnectTimerRef.current);
+      }
+      if (socketRef.current) {
+        socketRef.current.onclose = null;
+        socketRef.current.close();
+      }
       if (intervalRef.current) {
         clearInterval(intervalRef.current);
       }
-      if (statusIntervalRef.current) {
-        clearInterval(statusIntervalRef.current);
+      if (statusSourceRef.current) {
+        statusSourceRef.current.close();
+      }
+      if (frameUrlRef.current) {
+        URL.revokeObjectURL(frameUrlRef.current);
       }
     };
   }, []);
 
+  const showFrame = (blob) => {
+    if (!videoRef.current) {
+      return;
+    }
+    const url = URL.createObjectURL(blob);
+    videoRef.current.src = url;
+    if (frameUrlRef.current) {
+      URL.revokeObjectURL(frameUrlRef.current);
+    }
+    frameUrlRef.current = url;
+  };
+
+  // Fallback when the WebSocket channel is unavailable: poll frames, push status via SSE
+  const startPolling = () => {
+    // Update frame every 33ms (30 FPS)
+    intervalRef.current = setInterval(updateFrame, 33);
+
+    // Status changes are pushed by the server as Server-Sent Events
+    statusSourceRef.current = new EventSource(`${API_URL}/status/stream`);
+    statusSourceRef.current.onmessage = (event) => {
+      setDriverStatus(JSON.parse(event.data));
+    };
+
+    updateFrame();
+  };
+
+  // One WebSocket carries binary JPEG frames and JSON status updates
+  const openSocket = () => {
+    reconnectTimerRef.current = null;
+    const socket = new WebSocket(`${WS_URL}/ws`);
+    socket.binaryType = 'blob';
+    socket.onopen = () => {
+      socketOpenedRef.current = true;
+      socketRetriesRef.current = 0;
+    };
+    socket.onmessage = (event) => {
+      if (typeof event.data === 'string') {
+        setDriverStatus(JSON.parse(event.data));
+      } else {
+        showFrame(event.data);
+      }
+    };
+    socket.onclose = () => {
+      socketRef.current = null;
+      // A server without the WebSocket channel never accepts one: use HTTP right away.
+      // A dropped channel (restart, proxy timeout) is reopened with backoff first.
+      const retries = socketRetriesRef.current;
+      if (!socketOpenedRef.current || retries >= MAX_SOCKET_RETRIES) {
+        startPolling();
+        return;
+      }
+      socketRetriesRef.current = retries + 1;
+      const delay = Math.min(SOCKET_RETRY_BASE_MS * 2 ** retries, SOCKET_RETRY_MAX_MS);
+      reconnectTimerRef.current = setTimeout(openSocket, delay);
+    };
+    socketRef.current = socket;
+  };
+
   const startStream = async () => {
     try {
       setError(null);
@@ -37,15 +141,9 @@ function App() {
       await axios.get(`${API_URL}/start`);
       
       setIsStreaming(true);
-      
-      // Update frame every 33ms (30 FPS)
-      intervalRef.current = setInterval(updateFrame, 33);
-      
-      // Update status every 500ms
-      statusIntervalRef.current = setInterval(updateStatus, 500);
-      
-      // Initial updates
-      updateFrame();
+      socketOpenedRef.current = false;
+      socketRetriesRef.current = 0;
+      openSocket();
       updateStatus();
     } catch (err) {
       setError(`Failed to start video stream: ${err.message}`);
@@ -57,13 +155,7 @@ function App() {
     try {
       await axios.get(`${API_URL}/stop`);
       setIsStreaming(false);
-      
-      if (intervalRef.current) {
-        clearInterval(intervalRef.current);
-      }
-      if (statusIntervalRef.current) {
-        clearInterval(statusIntervalRef.current);
-      }
+      closeChannels();
     } catch (err) {
       setError(`Failed to stop video stream: ${err.message}`);
     }
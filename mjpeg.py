@@ -0,0 +1,165 @@
+"""
+Native MJPEG ingest.
+
+cv2.VideoCapture decodes every JPEG of an MJPEG stream, although viewers
+want JPEG again and most frames are never analysed. MJPEGStream instead
+splits the multipart HTTP response into raw JPEG buffers. They are forwarded
+to viewers untouched, and only the frames picked for inference are decoded,
+optionally at reduced scale via libjpeg's DCT scaling.
+"""
+
+import urllib.request
+from typing import Optional
+
+import cv2
+import numpy as np
+
+from logger import logger
+
+_READ_SIZE = 64 * 1024
+
+# Scale factor to the matching reduced-size imdecode flag
+_DECODE_FLAGS = {
+    1: cv2.IMREAD_COLOR,
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+def decode_jpeg(jpeg: bytes, scale: int = 1) -> Optional[np.ndarray]:
+    """
+    Decode JPEG bytes into a BGR frame.
+
+    Args:
+        jpeg: JPEG bytes
+        scale: Downscale factor applied while decoding (1, 2, 4 or 8)
+
+    Returns:
+        BGR frame, or None if the data could not be decoded
+    """
+    flag = _DECODE_FLAGS.get(scale, cv2.IMREAD_COLOR)
+    return cv2.imdecode(np.frombuffer(jpeg, dtype=np.uint8), flag)
+
+
+class MultipartJPEGReader:
+    """Splits a multipart/x-mixed-replace byte stream into JPEG parts."""
+
+    def __init__(self, stream, boundary: str):
+        """
+        Args:
+            stream: Binary file-like object positioned at the multipart body
+            boundary: Boundary from the Content-Type header
+        """
+        self.stream = stream
+        # Some servers include the leading dashes in the declared boundary
+        self.delimiter = b'--' + boundary.lstrip('-').encode('latin-1')
+        self._buffer = bytearray()
+
+    def _fill(self):
+        read = getattr(self.stream, 'read1', self.stream.read)
+        chunk = read(_READ_SIZE)
+        if not chunk:
+            raise EOFError("MJPEG stream ended")
+        self._buffer += chunk
+
+    def _find(self, needle: bytes, start: int = 0) -> int:
+        while True:
+            index = self._buffer.find(needle, start)
+            if index >= 0:
+                return index
+            # Resume the search where a partial match could still begin
+            start = max(len(self._buffer) - len(needle), start)
+            self._fill()
+
+    def read(self) -> bytes:
+        """
+        Read the next JPEG part.
+
+        Returns:
+            The JPEG bytes of the part
+
+        Raises:
+            EOFError: If the stream ends
+        """
+        start = self._find(self.delimiter)
+        header_end = self._find(b'\r\n\r\n', start)
+        headers = bytes(self._buffer[start + len(self.delimiter):header_end]).decode('latin-1')
+        del self._buffer[:header_end + 4]
+
+        length = None
+        for line in headers.split('\r\n'):
+            name, _, value = line.partition(':')
+            if name.strip().lower() == 'content-length' and value.strip().isdigit():
+                length = int(value)
+
+        if length is None:
+            length = self._find(b'\r\n' + self.delimiter)
+        while len(self._buffer) < length:
+            self._fill()
+        jpeg = bytes(self._buffer[:length])
+        del self._buffer[:length]
+        return jpeg
+
+
+class MJPEGStream:
+    """HTTP MJPEG source that yields raw JPEG bytes instead of decoded frames."""
+
+    def __init__(self, url: str, timeout: float = 10.0):
+        """
+        Args:
+            url: HTTP(S) URL of the MJPEG stream
+            timeout: Seconds allowed for connecting and for each read
+        """
+        self.url = url
+        self.timeout = timeout
+        self._response = None
+        self._reader = None
+
+    def open(self) -> bool:
+        """Connect to the stream; returns False if it is not a multipart MJPEG stream."""
+        try:
+            response = urllib.request.urlopen(self.url, timeout=self.timeout)
+        except OSError as e:
+            logger.error(f"Failed to connect to MJPEG stream {self.url}: {e}")
+            return False
+
+        content_type = response.headers.get('Content-Type', '')
+        boundary = None
+        for param in content_type.split(';')[1:]:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'boundary':
+                boundary = value.strip().strip('"')
+        if not content_type.startswith('multipart/') or not boundary:
+            logger.error(f"Not a multipart MJPEG stream: {content_type}")
+            response.close()
+            return False
+
+        self._response = response
+        self._reader = MultipartJPEGReader(response, boundary)
+        return True
+
+    def isOpened(self) -> bool:
+        return self._reader is not None
+
+    def read_jpeg(self) -> Optional[bytes]:
+        """
+        Read the next JPEG from the stream.
+
+        Returns:
+            JPEG bytes, or None if the stream failed or ended
+        """
+        if self._reader is None:
+            return None
+        try:
+            return self._reader.read()
+        except (OSError, EOFError) as e:
+            logger.warning(f"MJPEG stream read failed: {e}")
+            return None
+
+    def release(self):
+        """Close the connection."""
+        if self._response is not None:
+            self._response.close()
+        self._response = None
+        self._reader = None
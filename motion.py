@@ -0,0 +1,94 @@
+"""
+Change gating ahead of face analysis.
+
+In a parked or steadily cruising vehicle consecutive frames are nearly
+identical, and analysing each of them repeats the same result. The gate
+keeps a small grayscale thumbnail of the face region of the last analysed
+frame and reuses that frame's result while the mean pixel difference stays
+below a threshold. A reuse limit forces a fresh analysis regularly, which
+bounds how long a slow change such as closing eyes can go unnoticed.
+"""
+
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Side length of the thumbnails that are compared
+THUMBNAIL_SIZE = 32
+
+
+def region_thumbnail(frame: np.ndarray, box: Optional[Tuple[int, int, int, int]] = None,
+                     size: int = THUMBNAIL_SIZE) -> np.ndarray:
+    """
+    Downsample a region of a BGR frame to a small grayscale thumbnail.
+
+    Args:
+        frame: BGR frame
+        box: Region as (x, y, width, height); None uses the whole frame
+        size: Thumbnail side length
+
+    Returns:
+        size x size grayscale thumbnail as int16, ready for differencing
+    """
+    if box is not None and box[2] > 0 and box[3] > 0:
+        x, y, w, h = box
+        frame = frame[y:y + h, x:x + w]
+    small = cv2.resize(frame, (size, size), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(small, cv2.COLOR_BGR2GRAY).astype(np.int16)
+
+
+class ChangeGate:
+    """Reuses the last analysis while the face region has not changed."""
+
+    def __init__(self, threshold: float = 3.0, max_reuse: int = 5):
+        """
+        Args:
+            threshold: Mean absolute pixel difference (0-255) below which a frame counts as unchanged
+            max_reuse: Analyse at least every max_reuse + 1 frames regardless of change
+        """
+        self.threshold = threshold
+        self.max_reuse = max(max_reuse, 0)
+        self.analysis = None
+        self._box = None
+        self._thumbnail = None
+        self._reused = 0
+        self.gated = 0
+        self.analysed = 0
+
+    def unchanged(self, frame: np.ndarray) -> bool:
+        """
+        Check whether frame can reuse the last analysis.
+
+        Args:
+            frame: BGR frame
+
+        Returns:
+            True if the last analysis applies, counting the frame as gated
+        """
+        if self._thumbnail is None or self._reused >= self.max_reuse:
+            return False
+        thumbnail = region_thumbnail(frame, self._box)
+        if np.mean(np.abs(thumbnail - self._thumbnail)) >= self.threshold:
+            return False
+        self._reused += 1
+        self.gated += 1
+        return True
+
+    def update(self, frame: np.ndarray, analysis):
+        """
+        Record a freshly analysed frame as the new reference.
+
+        Args:
+            frame: BGR frame that was analysed
+            analysis: Its FaceAnalysis; the face box selects the compared region
+        """
+        self.analysis = analysis
+        self._box = analysis.box
+        self._thumbnail = region_thumbnail(frame, self._box)
+        self._reused = 0
+        self.analysed += 1
+
+    def stats(self) -> dict:
+        """Gated versus analysed frame counts."""
+        return {'frames_gated': self.gated, 'frames_analysed': self.analysed}
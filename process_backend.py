@@ -0,0 +1,189 @@
+"""
+Process-pool inference backend.
+
+Face detection, landmarks and emotion classification run in worker
+processes, so inference does not share the GIL with the Flask request
+threads and can use more than one core. Frames are written into a
+per-stream shared memory block; only the block name and shape travel over
+the pipe. Each stream is pinned to one worker, which keeps that stream's
+tracking state between frames.
+"""
+
+import multiprocessing
+import threading
+from multiprocessing import shared_memory
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from analysis import FaceAnalysis, create_analyzer, load_models, warm_up
+from logger import logger
+from roi import DriverROI
+
+
+def load_warm_models():
+    """Load the models and run them once, as each worker does before its first frame."""
+    models = load_models()
+    warm_up(models)
+    return models
+
+
+def _worker_main(conn, model_loader):
+    """Worker process loop: load models once, then analyse frames on request."""
+    models = model_loader()
+    analyzers = {}
+    buffers = {}
+    conn.send(('ready', None))
+
+    while True:
+        message = conn.recv()
+        if message[0] == 'close':
+            break
+
+        _, stream_id, shm_name, shape, dtype, roi_region = message
+        try:
+            if shm_name not in buffers:
+                buffers[shm_name] = shared_memory.SharedMemory(name=shm_name)
+            frame = np.ndarray(shape, dtype=dtype, buffer=buffers[shm_name].buf)
+
+            analyzer = analyzers.get(stream_id)
+            if analyzer is None:
+                # The parent owns ROI calibration and persistence; the worker only crops
+                roi = DriverROI(stream_id, auto_calibrate=False)
+                analyzer = analyzers[stream_id] = create_analyzer(models, roi)
+            analyzer.roi.region = roi_region
+
+            conn.send(('ok', tuple(analyzer.analyze(frame))))
+        except Exception as e:
+            conn.send(('error', str(e)))
+
+    for buffer in buffers.values():
+        buffer.close()
+
+
+class _Worker:
+    def __init__(self, context, index: int, model_loader: Callable[[], tuple]):
+        self.context = context
+        self.index = index
+        self.model_loader = model_loader
+        self.lock = threading.Lock()
+        self.restarts = 0
+        self._start()
+
+    def _start(self):
+        self.conn, child_conn = self.context.Pipe()
+        self.process = self.context.Process(
+            target=_worker_main, args=(child_conn, self.model_loader),
+            name=f"inference-process-{self.index}", daemon=True
+        )
+        self.process.start()
+        self.ready = False
+
+    def wait_ready(self):
+        with self.lock:
+            self._wait_ready()
+
+    def _wait_ready(self):
+        if not self.ready:
+            self.conn.recv()  # wait for model loading and warm-up to finish
+            self.ready = True
+
+    def request(self, message):
+        with self.lock:
+            if not self.process.is_alive():
+                # A crashed worker takes its streams' tracking state with it; start afresh
+                logger.warning(f"Inference worker {self.index} exited with {self.process.exitcode}, restarting")
+                self.conn.close()
+                self.restarts += 1
+                self._start()
+            try:
+                self._wait_ready()
+                self.conn.send(message)
+                return self.conn.recv()
+            except (EOFError, OSError) as e:
+                # Restarted on the next request
+                return 'error', f"worker {self.index} exited: {e!r}"
+
+    def close(self):
+        try:
+            with self.lock:
+                self.conn.send(('close',))
+        except (OSError, EOFError):
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+class ProcessInferenceBackend:
+    """Runs FaceAnalyzer in worker processes fed through shared memory."""
+
+    def __init__(self, processes: int = 2, model_loader: Callable[[], tuple] = load_warm_models):
+        """
+        Args:
+            processes: Number of worker processes
+            model_loader: Module-level function run in each worker that returns the
+                models tuple; it is pickled by reference into the spawned process
+        """
+        context = multiprocessing.get_context('spawn')
+        self.workers = [_Worker(context, index, model_loader) for index in range(max(processes, 1))]
+        self._assignments: Dict[str, _Worker] = {}
+        self._buffers: Dict[str, shared_memory.SharedMemory] = {}
+        self._lock = threading.Lock()
+        logger.info(f"Process inference backend started with {len(self.workers)} workers")
+
+    def wait_ready(self):
+        """Block until every worker has loaded and warmed up its models."""
+        for worker in self.workers:
+            worker.wait_ready()
+
+    def _worker_for(self, stream_id: str) -> _Worker:
+        with self._lock:
+            worker = self._assignments.get(stream_id)
+            if worker is None:
+                worker = self.workers[len(self._assignments) % len(self.workers)]
+                self._assignments[stream_id] = worker
+            return worker
+
+    def _buffer_for(self, stream_id: str, nbytes: int) -> shared_memory.SharedMemory:
+        with self._lock:
+            buffer = self._buffers.get(stream_id)
+            if buffer is None or buffer.size < nbytes:
+                if buffer is not None:
+                    buffer.close()
+                    buffer.unlink()
+                buffer = shared_memory.SharedMemory(create=True, size=nbytes)
+                self._buffers[stream_id] = buffer
+            return buffer
+
+    def analyze(self, stream_id: str, frame: np.ndarray, roi_region: Optional[Tuple[int, int, int, int]] = None):
+        """
+        Analyse a frame in the stream's worker process.
+
+        Args:
+            stream_id: Stream the frame belongs to
+            frame: BGR frame
+            roi_region: Current driver ROI of the stream, if any
+
+        Returns:
+            FaceAnalysis for the primary face
+        """
+        buffer = self._buffer_for(stream_id, frame.nbytes)
+        np.ndarray(frame.shape, dtype=frame.dtype, buffer=buffer.buf)[...] = frame
+
+        status, result = self._worker_for(stream_id).request(
+            ('analyze', stream_id, buffer.name, frame.shape, frame.dtype.str, roi_region)
+        )
+        if status != 'ok':
+            raise RuntimeError(f"Inference worker failed: {result}")
+        return FaceAnalysis(*result)
+
+    def close(self):
+        """Stop the worker processes and release shared memory; safe to call more than once."""
+        for worker in self.workers:
+            worker.close()
+        with self._lock:
+            for buffer in self._buffers.values():
+                buffer.close()
+                buffer.unlink()
+            self._buffers = {}
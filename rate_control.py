@@ -0,0 +1,69 @@
+"""
+Adaptive analysis-rate control for the inference loop.
+
+Instead of a static FRAME_SKIP, the controller measures how long each frame
+takes to analyse and spaces analyses so that inference uses at most a
+configured share of one CPU core. Weak hosts analyse fewer frames per second,
+strong hosts use their headroom up to MAX_FPS.
+"""
+
+import time
+from typing import Optional
+
+
+class AdaptiveRateController:
+    """Derives the analysis interval from measured processing time."""
+
+    def __init__(self, cpu_budget: float, max_fps: float, min_fps: float = 1.0, smoothing: float = 0.2):
+        """
+        Args:
+            cpu_budget: Fraction of one core inference may use (0 < budget <= 1)
+            max_fps: Upper bound on analyses per second
+            min_fps: Lower bound on analyses per second
+            smoothing: Weight of the newest sample in the moving average
+        """
+        self.cpu_budget = min(max(cpu_budget, 0.01), 1.0)
+        self.min_interval = 1.0 / max_fps
+        self.max_interval = 1.0 / min_fps
+        self.smoothing = smoothing
+        self.processing_time = 0.0
+        self.next_due = 0.0
+
+    @property
+    def interval(self) -> float:
+        """Seconds between the start of consecutive analyses."""
+        interval = self.processing_time / self.cpu_budget
+        return min(max(interval, self.min_interval), self.max_interval)
+
+    @property
+    def effective_fps(self) -> float:
+        """Current target number of analyses per second."""
+        return 1.0 / self.interval
+
+    def ready(self, now: Optional[float] = None) -> bool:
+        """
+        Check whether the next analysis is due.
+
+        Args:
+            now: Current time, defaults to time.time()
+
+        Returns:
+            True if a frame should be analysed now
+        """
+        now = time.time() if now is None else now
+        if now < self.next_due:
+            return False
+        self.next_due = now + self.interval
+        return True
+
+    def record(self, processing_time: float):
+        """
+        Feed the duration of the last analysis into the moving average.
+
+        Args:
+            processing_time: Seconds spent analysing one frame
+        """
+        if self.processing_time == 0.0:
+            self.processing_time = processing_time
+        else:
+            self.processing_time += self.smoothing * (processing_time - self.processing_time)
@@ -0,0 +1,83 @@
+"""
+Background source reconnection.
+
+Reopening a dropped stream can block for the full OpenCV/FFmpeg open
+timeout. The Reconnector keeps those attempts off the capture thread and
+spaces them with exponential backoff, so capture can carry on from a
+standby source (or report the stream as down) in the meantime.
+"""
+
+import threading
+from typing import Callable, Iterator, Optional
+
+from logger import logger
+
+
+def backoff_delays(initial: float, maximum: float, factor: float = 2.0) -> Iterator[float]:
+    """
+    Yield retry delays growing by factor from initial up to maximum.
+
+    Args:
+        initial: First delay in seconds
+        maximum: Upper bound on any delay
+        factor: Growth per attempt
+    """
+    delay = initial
+    while True:
+        yield min(delay, maximum)
+        delay = min(delay * factor, maximum)
+
+
+class Reconnector:
+    """Reopens a source in a background thread until it succeeds or is stopped."""
+
+    def __init__(self, open_source: Callable[[], Optional[object]], on_connected: Callable[[object], None],
+                 initial_delay: float = 0.5, max_delay: float = 30.0, name: str = "reconnect"):
+        """
+        Args:
+            open_source: Returns an opened source, or None if the attempt failed
+            on_connected: Called from the reconnect thread with the opened source
+            initial_delay: Seconds before the first attempt
+            max_delay: Upper bound on the wait between attempts
+            name: Thread name
+        """
+        self.open_source = open_source
+        self.on_connected = on_connected
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.name = name
+        self.attempts = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def active(self) -> bool:
+        """True while reconnection attempts are in progress."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start reconnecting unless an attempt loop is already running."""
+        if self.active:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop further attempts; an open call in progress is allowed to finish."""
+        self._stop.set()
+
+    def _run(self):
+        for delay in backoff_delays(self.initial_delay, self.max_delay):
+            if self._stop.wait(delay):
+                return
+            self.attempts += 1
+            try:
+                source = self.open_source()
+            except Exception as e:
+                logger.warning(f"Reconnect attempt {self.attempts} failed: {e}")
+                source = None
+            if source is not None:
+                self.on_connected(source)
+                return
+            logger.info(f"Source still unavailable, next attempt in up to {min(delay * 2, self.max_delay):.1f}s")
@@ -0,0 +1,196 @@
+"""
+Driver-seat region of interest.
+
+In a vehicle the driver's face stays in roughly the same part of the frame.
+The ROI is either set manually or calibrated from the first detections, is
+saved per stream, and restricts face detection to that crop. This is faster
+and keeps passengers out of the analysis.
+"""
+
+import json
+import os
+from typing import List, Optional, Tuple
+
+from logger import logger
+
+Box = Tuple[int, int, int, int]
+
+
+def is_valid_region(region) -> bool:
+    """Check that a box has non-negative offsets and a positive size."""
+    if len(region) != 4 or not all(isinstance(value, int) for value in region):
+        return False
+    x, y, w, h = region
+    return x >= 0 and y >= 0 and w > 0 and h > 0
+
+
+def parse_roi(value: str) -> Optional[Box]:
+    """
+    Parse an "x,y,w,h" string into a box.
+
+    Args:
+        value: Comma separated ROI, or an empty string
+
+    Returns:
+        Box as (x, y, width, height), or None if empty or invalid
+    """
+    if not value:
+        return None
+    try:
+        x, y, w, h = (int(part) for part in value.split(','))
+    except ValueError:
+        logger.warning(f"Ignoring invalid ROI value: {value}")
+        return None
+    if not is_valid_region((x, y, w, h)):
+        logger.warning(f"Ignoring ROI with negative offsets or an empty size: {value}")
+        return None
+    return x, y, w, h
+
+
+def clamp_region(region: Box, frame_shape: Tuple[int, ...]) -> Optional[Box]:
+    """
+    Clip a box to the frame.
+
+    Args:
+        region: Box as (x, y, width, height)
+        frame_shape: Shape of the frame the box refers to
+
+    Returns:
+        The part of the box inside the frame, or None if they do not overlap
+    """
+    height, width = frame_shape[:2]
+    x, y, w, h = region
+    left, top = max(x, 0), max(y, 0)
+    right, bottom = min(x + w, width), min(y + h, height)
+    if right <= left or bottom <= top:
+        return None
+    return left, top, right - left, bottom - top
+
+
+class DriverROI:
+    """Region of the frame in which the driver's face is searched."""
+
+    def __init__(self, stream_id: str = 'default', storage_dir: Optional[str] = None,
+                 calibration_frames: int = 30, margin: float = 0.5, region: Optional[Box] = None,
+                 auto_calibrate: bool = True):
+        """
+        Args:
+            stream_id: Identifier used for the saved calibration file
+            storage_dir: Directory for saved ROIs; None disables persistence
+            calibration_frames: Number of detections used for auto-calibration
+            margin: Fraction of the face size added around the observed boxes
+            region: Manually configured ROI, overrides any saved one
+            auto_calibrate: Derive the ROI from detections when none is set
+        """
+        self.stream_id = stream_id
+        self.storage_dir = storage_dir
+        self.calibration_frames = calibration_frames
+        self.margin = margin
+        self.auto_calibrate = auto_calibrate
+        self.samples: List[Box] = []
+        self.misses = 0
+        self.region = region if region is not None else self.load()
+
+    @property
+    def path(self) -> Optional[str]:
+        """Path of the saved calibration for this stream."""
+        if not self.storage_dir:
+            return None
+        return os.path.join(self.storage_dir, f"roi_{self.stream_id}.json")
+
+    @property
+    def calibrated(self) -> bool:
+        """True once a region is available."""
+        return self.region is not None
+
+    def load(self) -> Optional[Box]:
+        """Load the saved ROI for this stream, if any."""
+        path = self.path
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                region = tuple(json.load(f)['region'])
+            if not is_valid_region(region):
+                raise ValueError(f"invalid region {list(region)}")
+            logger.info(f"Loaded driver ROI for stream {self.stream_id}: {region}")
+            return region
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Could not load driver ROI from {path}: {e}")
+            return None
+
+    def save(self):
+        """Persist the current ROI for this stream."""
+        path = self.path
+        if path is None or self.region is None:
+            return
+        try:
+            os.makedirs(self.storage_dir, exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump({'stream_id': self.stream_id, 'region': list(self.region)}, f)
+        except OSError as e:
+            logger.warning(f"Could not save driver ROI to {path}: {e}")
+
+    def set_region(self, region: Optional[Box]):
+        """
+        Set the ROI manually, or clear it to start a new calibration.
+
+        Args:
+            region: Box as (x, y, width, height), or None to recalibrate
+        """
+        self.region = region
+        self.samples = []
+        if region is None:
+            path = self.path
+            if path is not None and os.path.exists(path):
+                os.remove(path)
+        else:
+            self.save()
+
+    def fit(self, frame_shape: Tuple[int, ...]) -> Optional[Box]:
+        """
+        Clip the region to the frame it is applied to.
+
+        A loaded or manual region may come from another resolution; one that lies
+        entirely outside the frame is dropped, so calibration starts again.
+
+        Args:
+            frame_shape: Shape of the current frame
+
+        Returns:
+            The usable part of the region, or None
+        """
+        if self.region is None:
+            return None
+        region = clamp_region(self.region, frame_shape)
+        if region is None:
+            logger.warning(f"Driver ROI {self.region} of stream {self.stream_id} lies outside the frame, recalibrating")
+            self.set_region(None)
+        return region
+
+    def observe(self, box: Box, frame_shape: Tuple[int, ...]):
+        """
+        Feed a full-frame detection into the auto-calibration.
+
+        Args:
+            box: Detected face box as (x, y, width, height)
+            frame_shape: Shape of the frame the box refers to
+        """
+        if self.calibrated or not self.auto_calibrate:
+            return
+        self.samples.append(box)
+        if len(self.samples) < self.calibration_frames:
+            return
+
+        left = min(x for x, _, _, _ in self.samples)
+        top = min(y for _, y, _, _ in self.samples)
+        right = max(x + w for x, _, w, _ in self.samples)
+        bottom = max(y + h for _, y, _, h in self.samples)
+        pad_x = int(self.margin * (right - left))
+        pad_y = int(self.margin * (bottom - top))
+
+        height, width = frame_shape[:2]
+        left, top = max(left - pad_x, 0), max(top - pad_y, 0)
+        right, bottom = min(right + pad_x, width), min(bottom + pad_y, height)
+        self.set_region((left, top, right - left, bottom - top))
+        logger.info(f"Calibrated driver ROI for stream {self.stream_id}: {self.region}")
@@ -6,22 +6,35 @@ This server captures from local camera and streams MJPEG that can be consumed by
 
 import cv2
 import threading
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import logging
 from config import Config
+from frame_cache import FrameCache
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class StreamingServer:
-    def __init__(self, port=8080, camera_index=0):
+    def __init__(self, port=8080, camera_index=0, client_fps=30.0, width=None, height=None,
+                 fps=30.0, quality=None):
         self.port = port
         self.camera_index = camera_index
+        # Upper frame rate sent to each client; slower clients simply skip frames
+        self.client_fps = client_fps
+        # Requested capture resolution and rate; None keeps the camera default
+        self.width = width
+        self.height = height
+        self.fps = fps
         self.cap = None
         self.frame = None
         self.lock = threading.Lock()
         self.running = False
+        # Each captured frame is JPEG-encoded once and shared by every client
+        self.frame_cache = FrameCache(quality if quality is not None else Config.JPEG_QUALITY)
+        self.clients = 0
+        self.httpd = None
         
     def capture_frames(self):
         """Capture frames from camera in a separate thread."""
@@ -30,18 +43,43 @@ class StreamingServer:
             logger.error(f"Failed to open camera {self.camera_index}")
             return
             
+        if self.width:
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        if self.height:
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        if self.fps:
+            self.cap.set(cv2.CAP_PROP_FPS, self.fps)
+        # Keep the driver from queueing frames where the backend supports it
+        self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
         logger.info(f"Camera {self.camera_index} opened successfully")
         
+        interval = 1.0 / self.fps if self.fps else 0.0
+        next_capture = time.monotonic()
         while self.running:
-            ret, frame = self.cap.read()
-            if ret:
-                with self.lock:
-                    self.frame = frame.copy()
+            # Every frame the driver delivers is grabbed, so none wait in its
+            # buffer; only frames due at the configured rate are decoded. Sleeping
+            # instead would leave the oldest buffered frame to be read next.
+            if not self.cap.grab():
+                time.sleep(0.01)
+                continue
+            now = time.monotonic()
+            if now < next_capture:
+                continue
+            next_capture = max(next_capture + interval, now)
+            
+            ret, frame = self.cap.retrieve()
+            if not ret:
+                continue
+            
+            # retrieve() returns a new array every time, so publishing is a
+            # reference swap; readers must treat frames as read-only
+            self.frame = frame
+            if self.clients:
+                self.frame_cache.publish(frame)
             
     def get_frame(self):
-        """Get the current frame."""
-        with self.lock:
-            return self.frame.copy() if self.frame is not None else None
+        """Get the current frame (shared, do not modify)."""
+        return self.frame
     
     def start(self):
         """Start the streaming server."""
@@ -64,41 +102,60 @@ class StreamingServer:
                     self.send_header('Connection', 'close')
                     self.end_headers()
                     
-                    while server.running:
-                        frame = server.get_frame()
-                        if frame is not None:
-                            try:
-                                # Encode frame as JPEG
-                                _, jpeg = cv2.imencode('.jpg', frame)
-                                payload = jpeg.tobytes()
-                                self.wfile.write(b'--frame\r\n')
-                                self.send_header('Content-Type', 'image/jpeg')
-                                self.send_header('Content-Length', str(len(payload)))
-                                self.end_headers()
-                                self.wfile.write(payload)
-                                self.wfile.write(b'\r\n')
-                                try:
-                                    self.wfile.flush()
-                                except Exception:
-                                    pass
-                            except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
-                                logger.info("Client disconnected from stream")
-                                break
-                            except Exception as e:
-                                logger.warning(f"Streaming error: {e}")
-                                break
-                        
-                        threading.Event().wait(0.033)  # ~30 FPS
+                    with server.lock:
+                        server.clients += 1
+                    try:
+                        self.stream_frames()
+                    finally:
+                        with server.lock:
+                            server.clients -= 1
                 else:
                     self.send_error(404)
             
+            def stream_frames(self):
+                # Only frames with a new sequence number are sent, at most
+                # client_fps per second. A slow client is blocked in the write
+                # and then continues with the newest frame, dropping the rest.
+                seq = 0
+                interval = 1.0 / server.client_fps if server.client_fps > 0 else 0.0
+                next_send = 0.0
+                while server.running:
+                    encoded = server.frame_cache.wait_newer(seq, timeout=1.0)
+                    if encoded is None:
+                        continue
+                    delay = next_send - time.monotonic()
+                    if delay > 0:
+                        time.sleep(delay)
+                        encoded = server.frame_cache.latest()
+                    seq = encoded.seq
+                    next_send = time.monotonic() + interval
+                    try:
+                        self.wfile.write(
+                            b'--frame\r\n'
+                            b'Content-Type: image/jpeg\r\n'
+                            b'Content-Length: ' + str(len(encoded.jpeg)).encode() + b'\r\n\r\n'
+                            + encoded.jpeg + b'\r\n'
+                        )
+                        self.wfile.flush()
+                    except (BrokenPipeError, ConnectionResetError, ConnectionAbortedError):
+                        logger.info("Client disconnected from stream")
+                        break
+                    except Exception as e:
+                        logger.warning(f"Streaming error: {e}")
+                        break
+            
             def log_message(self, format, *args):
                 # Suppress HTTP server logs
                 pass
         
         # Start HTTP server
         server = self  # Make server available to handler
-        httpd = HTTPServer(('', self.port), MJPEGHandler)
+        # One thread per client, so several viewers can share the camera
+        httpd = ThreadingHTTPServer(('', self.port), MJPEGHandler)
+        httpd.daemon_threads = True
+        # Port 0 picks a free port; report the one actually bound
+        self.port = httpd.server_address[1]
+        self.httpd = httpd
         logger.info(f"Streaming server started on port {self.port}")
         logger.info(f"Stream URL: http://localhost:{self.port}/stream.mjpg")
         
@@ -111,6 +168,13 @@ class StreamingServer:
             if self.cap:
                 self.cap.release()
             httpd.shutdown()
+            httpd.server_close()
+    
+    def stop(self):
+        """Stop serving; start() returns once the HTTP server has shut down."""
+        self.running = False
+        if self.httpd is not None:
+            self.httpd.shutdown()
 
 if __name__ == "__main__":
     import argparse
@@ -118,7 +182,15 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="MJPEG Streaming Server for OBS")
     parser.add_argument("--port", type=int, default=8080, help="Port to run server on")
     parser.add_argument("--camera", type=int, default=0, help="Camera index")
+    parser.add_argument("--client-fps", type=float, default=30.0, help="Maximum frame rate per client")
+    parser.add_argument("--width", type=int, default=None, help="Capture width (camera default if omitted)")
+    parser.add_argument("--height", type=int, default=None, help="Capture height (camera default if omitted)")
+    parser.add_argument("--fps", type=float, default=30.0, help="Capture frame rate (0 for unpaced)")
+    parser.add_argument("--quality", type=int, default=None, help="JPEG quality (JPEG_QUALITY if omitted)")
     args = parser.parse_args()
     
-    server = StreamingServer(port=args.port, camera_index=args.camera)
+    server = StreamingServer(
+        port=args.port, camera_index=args.camera, client_fps=args.client_fps,
+        width=args.width, height=args.height, fps=args.fps, quality=args.quality
+    )
     server.start()
\ No newline at end of file
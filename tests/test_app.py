@@ -1,9 +1,11 @@
+import asyncio
 import unittest
 import numpy as np
 import cv2
 from unittest.mock import Mock, patch, MagicMock
 import sys
 import os
+import time
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -13,6 +15,7 @@ from utils import (
     validate_frame,
     sanitize_emotion_label,
     calculate_sleep_probability,
+    rect_to_box,
     safe_release_resources
 )
 
@@ -75,6 +78,1166 @@ class TestUtils(unittest.TestCase):
         safe_release_resources(mock_resource)
         mock_resource.release.assert_called_once()
 
+    def test_rect_to_box_clamps_to_frame(self):
+        """Test dlib rectangle conversion is clamped to the frame."""
+        rect = Mock()
+        rect.left.return_value = -10
+        rect.top.return_value = 20
+        rect.right.return_value = 700
+        rect.bottom.return_value = 120
+        self.assertEqual(rect_to_box(rect, (480, 640, 3)), (0, 20, 639, 100))
+
+class TestFaceAnalyzer(unittest.TestCase):
+    """Test the shared face analysis stage."""
+
+    def setUp(self):
+        self.frame = np.zeros((480, 640, 3), dtype=np.uint8)
+
+    def test_no_face_skips_models(self):
+        """Test that landmarks and emotions are skipped without a face."""
+        from analysis import FaceAnalyzer, NO_FACE
+
+        detector = Mock(return_value=[])
+        predictor = Mock()
+        emotion_detector = Mock()
+        analyzer = FaceAnalyzer(detector, predictor, emotion_detector)
+
+        self.assertEqual(analyzer.analyze(self.frame), NO_FACE)
+        predictor.assert_not_called()
+        emotion_detector.classify.assert_not_called()
+
+    @patch('analysis.calculate_ear', return_value=0.2)
+    def test_face_detected_once(self, mock_ear):
+        """Test that the detected box is shared with the emotion classifier."""
+        from analysis import FaceAnalyzer
+        from emotion import FERClassifier
+
+        rect = Mock()
+        rect.left.return_value = 100
+        rect.top.return_value = 50
+        rect.right.return_value = 200
+        rect.bottom.return_value = 150
+        detector = Mock(return_value=[rect])
+        emotion_detector = Mock()
+        emotion_detector.detect_emotions.return_value = [{'emotions': {'happy': 1.0}}]
+        analyzer = FaceAnalyzer(detector, Mock(), FERClassifier(emotion_detector))
+
+        analysis = analyzer.analyze(self.frame)
+
+        detector.assert_called_once()
+        emotion_detector.detect_emotions.assert_called_once_with(
+            self.frame, face_rectangles=[(100, 50, 100, 100)]
+        )
+        self.assertEqual(analysis.emotions, {'happy': 1.0})
+        self.assertTrue(analysis.eyes_closed)
+
+    @patch('analysis.calculate_ear', return_value=0.2)
+    def test_emotion_runs_at_lower_rate(self, mock_ear):
+        """Test that landmarks run every frame while the latest emotion is reused in between."""
+        from analysis import FaceAnalyzer
+
+        rect = Mock()
+        rect.left.return_value = 100
+        rect.top.return_value = 50
+        rect.right.return_value = 200
+        rect.bottom.return_value = 150
+        emotion_detector = Mock()
+        emotion_detector.classify.return_value = {'sad': 1.0}
+        analyzer = FaceAnalyzer(Mock(return_value=[rect]), Mock(), emotion_detector, emotion_interval=60.0)
+
+        analyses = [analyzer.analyze(self.frame) for _ in range(3)]
+
+        self.assertEqual(mock_ear.call_count, 3)
+        emotion_detector.classify.assert_called_once()
+        self.assertEqual([analysis.emotions for analysis in analyses], [{'sad': 1.0}] * 3)
+        self.assertEqual((analyzer.emotion_runs, analyzer.emotion_reused), (1, 2))
+
+    @patch('analysis.scale_rect', side_effect=lambda rect, factor: (rect, factor))
+    def test_detection_on_downscaled_frame(self, mock_scale):
+        """Test that detection runs on a downscaled copy and maps back."""
+        from analysis import FaceAnalyzer
+
+        detector = Mock(return_value=['face'])
+        analyzer = FaceAnalyzer(detector, Mock(), Mock(), detection_scale=0.5)
+
+        rect = analyzer.detect_face(np.zeros((480, 640), dtype=np.uint8))
+
+        self.assertEqual(detector.call_args[0][0].shape, (240, 320))
+        self.assertEqual(rect, ('face', 2.0))
+
+class TestDriverROI(unittest.TestCase):
+    """Test driver-seat ROI calibration."""
+
+    def test_parse_roi(self):
+        """Test parsing of the manual ROI setting."""
+        from roi import parse_roi
+
+        self.assertEqual(parse_roi('10,20,300,200'), (10, 20, 300, 200))
+        self.assertIsNone(parse_roi(''))
+        self.assertIsNone(parse_roi('10,20'))
+
+    def test_auto_calibration(self):
+        """Test that the ROI is derived from the first detections with a margin."""
+        from roi import DriverROI
+
+        roi = DriverROI(calibration_frames=2, margin=0.5)
+        roi.observe((100, 100, 100, 100), (480, 640, 3))
+        self.assertFalse(roi.calibrated)
+        roi.observe((120, 110, 100, 100), (480, 640, 3))
+
+        self.assertEqual(roi.region, (40, 45, 240, 220))
+
+    def test_saved_region_is_validated(self):
+        """Test that invalid saved ROIs are ignored and ones outside the frame are dropped."""
+        import json
+        import tempfile
+        from roi import DriverROI
+
+        with tempfile.TemporaryDirectory() as storage_dir:
+            with open(os.path.join(storage_dir, 'roi_car1.json'), 'w') as f:
+                json.dump({'stream_id': 'car1', 'region': [-20, 10, 100, 100]}, f)
+            self.assertIsNone(DriverROI('car1', storage_dir).region)
+
+            DriverROI('car1', storage_dir).set_region((600, 400, 100, 100))
+            roi = DriverROI('car1', storage_dir)
+            self.assertEqual(roi.fit((480, 640, 3)), (600, 400, 40, 80))
+            self.assertIsNone(roi.fit((240, 320, 3)))
+            self.assertFalse(roi.calibrated)
+            self.assertFalse(os.path.exists(roi.path))
+
+class TestEmotionBatcher(unittest.TestCase):
+    """Test batched emotion inference."""
+
+    def test_concurrent_faces_share_a_batch(self):
+        """Test that faces submitted while a batch runs are classified together."""
+        import threading
+        from emotion import CNNEmotionClassifier, EmotionBatcher, EMOTION_LABELS
+
+        batch_sizes = []
+        release = threading.Event()
+
+        def predict(batch):
+            batch_sizes.append(len(batch))
+            release.wait(timeout=2)
+            scores = np.zeros((len(batch), len(EMOTION_LABELS)), dtype=np.float32)
+            scores[:, EMOTION_LABELS.index('happy')] = 1.0
+            return scores
+
+        batcher = EmotionBatcher(predict, max_batch=4, max_wait=0.5)
+        classifier = CNNEmotionClassifier(batcher)
+        frame = np.zeros((480, 640, 3), dtype=np.uint8)
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(classifier.classify(frame, (10, 10, 100, 100))))
+            for _ in range(5)
+        ]
+        threads[0].start()
+        deadline = time.monotonic() + 2
+        while not batch_sizes and time.monotonic() < deadline:
+            time.sleep(0.01)
+        for thread in threads[1:]:
+            thread.start()
+        while batcher._active < 5 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join(timeout=2)
+
+        self.assertEqual(batch_sizes, [1, 4])
+        self.assertEqual(len(results), 5)
+        self.assertEqual(results[0]['happy'], 1.0)
+
+    def test_single_submitter_does_not_wait(self):
+        """Test that a lone classification runs without waiting for a batch to fill."""
+        from emotion import EmotionBatcher, EMOTION_LABELS
+
+        batcher = EmotionBatcher(lambda batch: np.zeros((len(batch), len(EMOTION_LABELS))), max_wait=5.0)
+        started_at = time.monotonic()
+        batcher.submit(np.zeros((48, 48, 1), dtype=np.float32))
+        batcher.submit(np.zeros((48, 48, 1), dtype=np.float32))
+
+        self.assertLess(time.monotonic() - started_at, 1.0)
+        self.assertEqual(batcher.stats()['emotion_batches'], 2)
+
+    def test_numpy_cnn_forward_pass(self):
+        """Test the NumPy CNN against a direct convolution and softmax output."""
+        from emotion import NumpyEmotionCNN, _conv2d_relu
+
+        rng = np.random.default_rng(0)
+        x = rng.random((1, 5, 5, 2)).astype(np.float32)
+        kernel = rng.standard_normal((3, 3, 2, 4)).astype(np.float32)
+        bias = rng.standard_normal(4).astype(np.float32)
+        expected = np.maximum(np.einsum('ijc,ijcf->f', x[0, 1:4, 2:5], kernel) + bias, 0)
+        np.testing.assert_allclose(_conv2d_relu(x, kernel, bias)[0, 1, 2], expected, rtol=1e-5)
+
+        shapes = [(3, 3, 1, 32), (32,), (3, 3, 32, 64), (64,), (3, 3, 64, 128), (128,),
+                  (2048, 128), (128,), (128, 7), (7,)]
+        model = NumpyEmotionCNN([rng.standard_normal(shape) * 0.1 for shape in shapes])
+        probabilities = model(rng.random((3, 48, 48, 1)))
+        self.assertEqual(probabilities.shape, (3, 7))
+        np.testing.assert_allclose(probabilities.sum(axis=1), 1.0, rtol=1e-5)
+
+class TestLatestFrameSlot(unittest.TestCase):
+    """Test the capture to inference frame handoff."""
+
+    def test_newest_frame_wins(self):
+        """Test that unconsumed frames are replaced and counted as skipped."""
+        from capture import LatestFrameSlot
+
+        slot = LatestFrameSlot()
+        for value in range(3):
+            slot.put(np.full((2, 2, 3), value, dtype=np.uint8))
+
+        frame, _ = slot.take(timeout=0)
+        self.assertEqual(frame[0, 0, 0], 2)
+        self.assertEqual(slot.dropped, 2)
+        self.assertEqual(slot.take(timeout=0)[0], None)
+
+    def test_close_wakes_worker(self):
+        """Test that closing the slot releases a waiting worker."""
+        from capture import LatestFrameSlot
+
+        slot = LatestFrameSlot()
+        slot.close()
+        self.assertIsNone(slot.take(timeout=1)[0])
+
+class TestReconnector(unittest.TestCase):
+    """Test background reconnection and standby failover."""
+
+    def test_backoff_grows_to_maximum(self):
+        """Test that retry delays double up to the configured maximum."""
+        from itertools import islice
+        from reconnect import backoff_delays
+
+        self.assertEqual(list(islice(backoff_delays(0.5, 4.0), 5)), [0.5, 1.0, 2.0, 4.0, 4.0])
+
+    def test_retries_until_source_opens(self):
+        """Test that failed attempts are retried and the opened source is handed over."""
+        import threading
+        from reconnect import Reconnector
+
+        connected = threading.Event()
+        open_source = Mock(side_effect=[None, RuntimeError('timeout'), 'source'])
+        on_connected = Mock(side_effect=lambda source: connected.set())
+        reconnector = Reconnector(open_source, on_connected, initial_delay=0, max_delay=0)
+        reconnector.start()
+
+        self.assertTrue(connected.wait(timeout=2))
+        self.assertEqual(reconnector.attempts, 3)
+        on_connected.assert_called_once_with('source')
+
+    def test_failover_to_standby_and_stale_status(self):
+        """Test that a lost primary switches to the standby, and a lost standby marks status stale."""
+        with patch.object(Config, 'PRELOAD_MODELS', False):
+            from app import VideoStreamHandler
+
+        handler = VideoStreamHandler('failover', source='0', standby='1')
+        handler.reconnector = Mock()
+        handler.standby_reconnector = Mock()
+        primary, standby = Mock(), Mock()
+        handler.standby_cap = standby
+        handler._switch_source(primary, 'primary')
+
+        handler._source_lost()
+        primary.release.assert_called_once()
+        self.assertIs(handler.cap, standby)
+        self.assertEqual(handler.get_status()['source'], 'standby')
+        handler.reconnector.start.assert_called_once()
+
+        handler._source_lost()
+        self.assertIsNone(handler.cap)
+        self.assertTrue(handler.get_status()['stale'])
+        handler.standby_reconnector.start.assert_called_once()
+
+    def test_idle_standby_is_drained(self):
+        """Test that the standby is grabbed while idle and left alone once it takes over."""
+        with patch.object(Config, 'PRELOAD_MODELS', False):
+            from app import VideoStreamHandler
+
+        handler = VideoStreamHandler('drain', source='0', standby='1')
+        handler.reconnector = Mock()
+        primary, standby = Mock(), Mock()
+        standby.grab.side_effect = lambda: time.sleep(0.005) or True
+        handler.running = True
+        self.addCleanup(setattr, handler, 'running', False)
+        handler.standby_cap = standby
+        handler._switch_source(primary, 'primary')
+
+        handler._start_standby_drain()
+        deadline = time.monotonic() + 2
+        while standby.grab.call_count < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertGreaterEqual(standby.grab.call_count, 3)
+
+        handler._source_lost()
+        grabs = standby.grab.call_count
+        time.sleep(0.05)
+        self.assertEqual(standby.grab.call_count, grabs)
+        self.assertIs(handler.cap, standby)
+
+    def test_standby_that_failed_to_open_is_retried(self):
+        """Test that a standby unavailable at start is reopened and used while the primary is down."""
+        from reconnect import Reconnector
+
+        with patch.object(Config, 'PRELOAD_MODELS', False):
+            from app import VideoStreamHandler
+
+        handler = VideoStreamHandler('retry', source='0', standby='1')
+        handler.reconnector = Mock()
+        standby = Mock()
+        standby.read.return_value = (True, np.zeros((4, 4, 3), dtype=np.uint8))
+        handler.standby_reconnector = Reconnector(
+            Mock(side_effect=[None, standby]), handler._standby_reconnected, initial_delay=0, max_delay=0
+        )
+        handler.start_capture()
+        self.addCleanup(handler.capture_thread.join, 2)
+        self.addCleanup(setattr, handler, 'running', False)
+
+        deadline = time.monotonic() + 2
+        while handler.cap is not standby and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertIs(handler.cap, standby)
+        self.assertEqual(handler.get_status()['source'], 'standby')
+
+    def test_source_switch_reaches_status_listeners(self):
+        """Test that a status-only change is pushed to listeners such as the frame bus."""
+        from frame_bus import FrameBusReader, publish_to_bus
+
+        with patch.object(Config, 'PRELOAD_MODELS', False):
+            from app import VideoStreamHandler
+
+        tracker = patch('frame_bus.resource_tracker')
+        tracker.start()
+        self.addCleanup(tracker.stop)
+
+        handler = VideoStreamHandler('switch', source='0')
+        handler.running = True
+        listener = Mock()
+        handler.status_listeners.append(listener)
+        prefix = f"safedrive_switch_{os.getpid()}"
+        writer = publish_to_bus(handler, prefix, 64 * 1024)
+        self.addCleanup(writer.close)
+        reader = FrameBusReader(prefix, 'switch')
+        self.addCleanup(reader.close)
+
+        handler._switch_source(None)
+
+        listener.assert_called_once_with()
+        snapshot = reader.read()
+        self.assertTrue(snapshot.status['stale'])
+        self.assertEqual(snapshot.status_seq, handler.status_seq)
+
+class TestAdaptiveRateController(unittest.TestCase):
+    """Test the latency-driven analysis rate."""
+
+    def test_rate_follows_processing_time(self):
+        """Test that slow inference lowers the analysis rate within bounds."""
+        from rate_control import AdaptiveRateController
+
+        controller = AdaptiveRateController(cpu_budget=0.5, max_fps=30, min_fps=1)
+        controller.record(0.1)
+        self.assertAlmostEqual(controller.effective_fps, 5.0)
+
+        controller.record(0.001)
+        self.assertLessEqual(controller.effective_fps, 30)
+
+        controller.processing_time = 10.0
+        self.assertAlmostEqual(controller.effective_fps, 1.0)
+
+    def test_ready_spaces_analyses(self):
+        """Test that frames arriving before the next slot are skipped."""
+        from rate_control import AdaptiveRateController
+
+        controller = AdaptiveRateController(cpu_budget=1.0, max_fps=10)
+        self.assertTrue(controller.ready(now=100.0))
+        self.assertFalse(controller.ready(now=100.05))
+        self.assertTrue(controller.ready(now=100.1))
+
+class TestChangeGate(unittest.TestCase):
+    """Test reuse of the last analysis for unchanged frames."""
+
+    def test_reuses_analysis_until_change_or_limit(self):
+        """Test that near-identical frames are gated, and changes or the reuse limit force analysis."""
+        from analysis import FaceAnalysis
+        from motion import ChangeGate
+
+        gate = ChangeGate(threshold=3.0, max_reuse=2)
+        frame = np.full((120, 160, 3), 100, dtype=np.uint8)
+        analysis = FaceAnalysis(box=(40, 30, 64, 64), emotions={'neutral': 1.0}, ear=0.3)
+        self.assertFalse(gate.unchanged(frame))
+        gate.update(frame, analysis)
+
+        noisy = frame.copy()
+        noisy[0, 0] = 255  # outside the face box
+        self.assertTrue(gate.unchanged(noisy))
+        self.assertIs(gate.analysis, analysis)
+
+        changed = frame.copy()
+        changed[30:94, 40:104] = 160
+        self.assertFalse(gate.unchanged(changed))
+
+        self.assertTrue(gate.unchanged(frame))
+        self.assertFalse(gate.unchanged(frame))
+        self.assertEqual(gate.stats(), {'frames_gated': 2, 'frames_analysed': 1})
+
+class TestFaceTracker(unittest.TestCase):
+    """Test tracking between full face detections."""
+
+    def setUp(self):
+        from tracking import FaceTracker
+
+        self.correlation_tracker = Mock()
+        self.tracker = FaceTracker(
+            detection_interval=3,
+            min_confidence=7.0,
+            tracker_factory=lambda: self.correlation_tracker,
+            to_rectangle=lambda position: position
+        )
+        self.gray = np.zeros((480, 640), dtype=np.uint8)
+        self.detect = Mock(return_value='face')
+
+    def test_detects_every_n_frames(self):
+        """Test that the detector only runs every detection_interval frames."""
+        self.correlation_tracker.update.return_value = 20.0
+        for _ in range(8):
+            self.tracker.locate(self.gray, self.detect)
+
+        self.assertEqual(self.detect.call_count, 2)
+        self.assertEqual(self.tracker.tracked, 6)
+
+    def test_low_confidence_forces_detection(self):
+        """Test that a weak track falls back to the full detector."""
+        self.correlation_tracker.update.return_value = 2.0
+        self.tracker.locate(self.gray, self.detect)
+        self.tracker.locate(self.gray, self.detect)
+
+        self.assertEqual(self.detect.call_count, 2)
+        self.assertEqual(self.tracker.tracked, 0)
+
+class TestFrameCache(unittest.TestCase):
+    """Test the encode-once frame cache."""
+
+    def test_frames_are_encoded_once_with_sequence(self):
+        """Test that readers share one encoding and sequence numbers increase."""
+        import base64
+        from frame_cache import FrameCache
+
+        cache = FrameCache(quality=80)
+        self.assertIsNone(cache.latest())
+
+        with patch('frame_cache.cv2.imencode', wraps=cv2.imencode) as mock_encode:
+            first = cache.publish(np.zeros((48, 64, 3), dtype=np.uint8))
+            self.assertIs(cache.latest(), first)
+            self.assertEqual(cache.latest().base64, base64.b64encode(first.jpeg).decode('utf-8'))
+            self.assertEqual(mock_encode.call_count, 1)
+
+        second = cache.publish(np.zeros((48, 64, 3), dtype=np.uint8))
+        self.assertEqual(second.seq, first.seq + 1)
+        self.assertIs(cache.wait_newer(first.seq, timeout=0), second)
+        self.assertIsNone(cache.wait_newer(second.seq, timeout=0))
+
+class TestFrameBus(unittest.TestCase):
+    """Test the shared-memory frame bus."""
+
+    def test_reader_sees_published_frames_and_status(self):
+        """Test that readers copy a frame once and notice status-only updates."""
+        from frame_bus import FrameBusReader, FrameBusWriter
+        from frame_cache import EncodedFrame
+
+        # Reader and writer share this process's resource tracker here
+        tracker = patch('frame_bus.resource_tracker')
+        tracker.start()
+        self.addCleanup(tracker.stop)
+
+        prefix = f"safedrive_test_{os.getpid()}"
+        writer = FrameBusWriter(prefix, 'car1', 64 * 1024)
+        self.addCleanup(writer.close)
+        reader = FrameBusReader(prefix, 'car1')
+        self.addCleanup(reader.close)
+
+        writer.publish(EncodedFrame(1, b'jpeg', 10.0), 1, {'emotion': 'sad'})
+        first = reader.read()
+        self.assertEqual((first.jpeg, first.frame_seq, first.status), (b'jpeg', 1, {'emotion': 'sad'}))
+        self.assertTrue(first.running)
+        self.assertIsNone(reader.read(first))
+
+        writer.set_running(False)
+        stopped = reader.read(first)
+        self.assertIsNone(stopped.jpeg)
+        self.assertFalse(stopped.running)
+        self.assertIsNone(FrameBusReader(prefix, 'car2').read())
+
+    def test_concurrent_reads_are_never_torn(self):
+        """Test that a reader racing a writer process only sees complete frames and status."""
+        import multiprocessing
+        from frame_bus import FrameBusReader
+
+        tracker = patch('frame_bus.resource_tracker')
+        tracker.start()
+        self.addCleanup(tracker.stop)
+
+        prefix = f"safedrive_race_{os.getpid()}"
+        context = multiprocessing.get_context('fork')
+        ready, stop = context.Event(), context.Event()
+        process = context.Process(target=_race_bus_writer, args=(prefix, ready, stop))
+        process.start()
+        self.addCleanup(process.join)
+        self.addCleanup(stop.set)
+        self.assertTrue(ready.wait(timeout=5))
+
+        reader = FrameBusReader(prefix, 'car1')
+        self.addCleanup(reader.close)
+        snapshots = 0
+        deadline = time.time() + 1.0
+        while time.time() < deadline:
+            snapshot = reader.read()
+            if snapshot is None or not snapshot.frame_seq:
+                continue
+            snapshots += 1
+            seq = snapshot.frame_seq
+            self.assertEqual(snapshot.status_seq, seq)
+            self.assertEqual(snapshot.jpeg, bytes([seq % 256]) * (100 + seq % 5000))
+            self.assertEqual(snapshot.status, {'seq': seq, 'pad': 'x' * (seq % 300)})
+        self.assertGreater(snapshots, 0)
+
+    def test_readers_follow_a_restarted_publisher(self):
+        """Test that workers agree on sequence numbers and recover from a publisher crash."""
+        import threading
+        from types import SimpleNamespace
+        from frame_bus import FrameBusWriter, mirror_from_bus
+        from frame_cache import EncodedFrame, FrameCache
+
+        tracker = patch('frame_bus.resource_tracker')
+        tracker.start()
+        self.addCleanup(tracker.stop)
+
+        def worker_handler():
+            lock = threading.Lock()
+            return SimpleNamespace(
+                stream_id='car1', frame_cache=FrameCache(), status_lock=lock,
+                status_changed=threading.Condition(lock), status_seq=0, status_epoch='boot',
+                status_data={}, running=False, status_listeners=[]
+            )
+
+        def wait_until(condition):
+            deadline = time.time() + 10
+            while not condition() and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertTrue(condition())
+
+        prefix = f"safedrive_restart_{os.getpid()}"
+        crashed = FrameBusWriter(prefix, 'car1', 64 * 1024)
+        self.addCleanup(crashed.shm.close)
+        crashed.start_heartbeat(0.02)
+        crashed.publish(EncodedFrame(7, b'old', 1.0), 3, {'emotion': 'old'})
+
+        stop = threading.Event()
+        self.addCleanup(stop.set)
+        workers = [worker_handler(), worker_handler()]
+        for handler in workers:
+            mirror_from_bus(handler, prefix, 0.01, heartbeat_timeout=0.5, stop=stop)
+        wait_until(lambda: all(handler.status_data == {'emotion': 'old'} for handler in workers))
+        self.assertEqual({(h.status_epoch, h.status_seq) for h in workers}, {(f"{crashed.generation:x}", 3)})
+        self.assertEqual({h.frame_cache.latest().tag for h in workers}, {f"{crashed.generation:x}-7"})
+        self.assertTrue(all(handler.bus_attached for handler in workers))
+
+        # Simulated crash: the heartbeat stops without the stream being marked stopped
+        crashed._closed.set()
+        crashed._heartbeat_thread.join()
+        wait_until(lambda: all(handler.status_data.get('stale') for handler in workers))
+        self.assertFalse(any(handler.running for handler in workers))
+
+        restarted = FrameBusWriter(prefix, 'car1', 64 * 1024)
+        self.addCleanup(restarted.close)
+        restarted.start_heartbeat(0.02)
+        restarted.publish(EncodedFrame(1, b'new', 2.0), 1, {'emotion': 'new'})
+        wait_until(lambda: all(handler.status_data == {'emotion': 'new'} for handler in workers))
+        self.assertTrue(all(handler.running for handler in workers))
+        self.assertEqual(workers[0].frame_cache.latest().jpeg, b'new')
+        self.assertEqual({h.status_epoch for h in workers}, {f"{restarted.generation:x}"})
+
+def _race_bus_writer(prefix, ready, stop):
+    """Publish frames whose length and content depend on their sequence number."""
+    from frame_bus import FrameBusWriter
+    from frame_cache import EncodedFrame
+
+    writer = FrameBusWriter(prefix, 'car1', 64 * 1024)
+    ready.set()
+    seq = 0
+    while not stop.is_set():
+        seq += 1
+        jpeg = bytes([seq % 256]) * (100 + seq % 5000)
+        writer.publish(EncodedFrame(seq, jpeg, float(seq)), seq, {'seq': seq, 'pad': 'x' * (seq % 300)})
+    writer.close()
+
+class TestStreamingServer(unittest.TestCase):
+    """Test the OBS relay capture loop."""
+
+    def test_capture_publishes_frames_without_copying(self):
+        """Test that captured frames are swapped in by reference and reach clients through the cache."""
+        from streaming_server import StreamingServer
+
+        frames = [np.full((4, 4, 3), value, dtype=np.uint8) for value in range(3)]
+        remaining = iter(frames)
+        server = StreamingServer(fps=0, width=640, height=480)
+
+        def grab():
+            cap.grabbed = next(remaining, None)
+            if cap.grabbed is None:
+                server.running = False
+                return False
+            return True
+
+        cap = Mock()
+        cap.isOpened.return_value = True
+        cap.grab.side_effect = grab
+        cap.retrieve.side_effect = lambda: (True, cap.grabbed)
+        server.running = True
+        server.clients = 1
+        with patch('streaming_server.cv2.VideoCapture', return_value=cap):
+            server.capture_frames()
+
+        cap.set.assert_any_call(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        cap.set.assert_any_call(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.assertIs(server.get_frame(), frames[-1])
+        encoded = server.frame_cache.wait_newer(0, timeout=0)
+        self.assertEqual(encoded.seq, 3)
+        decoded = cv2.imdecode(np.frombuffer(encoded.jpeg, dtype=np.uint8), cv2.IMREAD_COLOR)
+        self.assertTrue(np.all(np.abs(decoded.astype(int) - 2) <= 1))
+        self.assertIsNone(server.frame_cache.wait_newer(encoded.seq, timeout=0))
+
+    def test_capture_paces_with_the_newest_frame(self):
+        """Test that frames arriving faster than the configured rate are grabbed but not decoded."""
+        from streaming_server import StreamingServer
+
+        server = StreamingServer(fps=20)
+        grabbed, retrieved = [], []
+
+        def grab():
+            time.sleep(0.005)
+            grabbed.append(len(grabbed))
+            if len(grabbed) >= 60:
+                server.running = False
+            return True
+
+        cap = Mock()
+        cap.isOpened.return_value = True
+        cap.grab.side_effect = grab
+        cap.retrieve.side_effect = lambda: retrieved.append(grabbed[-1]) or (True, grabbed[-1])
+        server.running = True
+        with patch('streaming_server.cv2.VideoCapture', return_value=cap):
+            server.capture_frames()
+
+        self.assertEqual(cap.grab.call_count, 60)
+        self.assertLess(len(retrieved), 20)
+        # Frames in between were dropped rather than left in the buffer for later
+        self.assertTrue(all(later - earlier >= 2 for earlier, later in zip(retrieved, retrieved[1:])))
+        self.assertEqual(server.get_frame(), retrieved[-1])
+
+    def test_clients_share_one_encoding_per_frame(self):
+        """Test that concurrent viewers are served from frames encoded once each."""
+        import threading
+        import urllib.request
+        from streaming_server import StreamingServer
+
+        cap = Mock()
+        cap.isOpened.return_value = True
+        cap.grab.return_value = True
+        cap.retrieve.side_effect = lambda: (True, np.full((48, 64, 3), 128, dtype=np.uint8))
+        server = StreamingServer(port=0, fps=50)
+
+        with patch('streaming_server.cv2.VideoCapture', return_value=cap), \
+                patch('frame_cache.cv2.imencode', wraps=cv2.imencode) as imencode:
+            thread = threading.Thread(target=server.start, daemon=True)
+            thread.start()
+            deadline = time.monotonic() + 5
+            while server.httpd is None and time.monotonic() < deadline:
+                time.sleep(0.01)
+            time.sleep(0.1)
+            # Nothing is encoded while nobody watches
+            self.assertEqual(imencode.call_count, 0)
+
+            url = f'http://127.0.0.1:{server.port}/stream.mjpg'
+            viewers = [urllib.request.urlopen(url, timeout=5) for _ in range(2)]
+            try:
+                for viewer in viewers:
+                    for _ in range(3):
+                        self.assertEqual(viewer.readline(), b'--frame\r\n')
+                        viewer.readline()
+                        length = int(viewer.readline().split(b':')[1])
+                        viewer.readline()
+                        self.assertEqual(viewer.read(length)[:2], b'\xff\xd8')
+                        viewer.readline()
+            finally:
+                server.stop()
+                for viewer in viewers:
+                    viewer.close()
+                thread.join(5)
+
+        self.assertGreaterEqual(server.frame_cache.latest().seq, 3)
+        self.assertEqual(imencode.call_count, server.frame_cache.latest().seq)
+
+class TestMJPEGIngest(unittest.TestCase):
+    """Test parsing MJPEG streams into raw JPEG parts."""
+
+    def test_parts_with_and_without_length(self):
+        """Test that parts are split by Content-Length or by the next boundary."""
+        import io
+        from mjpeg import MultipartJPEGReader, decode_jpeg
+
+        _, encoded = cv2.imencode('.jpg', np.zeros((64, 96, 3), dtype=np.uint8))
+        jpeg = encoded.tobytes()
+        body = (b'--frame\r\nContent-Type: image/jpeg\r\nContent-Length: ' + str(len(jpeg)).encode()
+                + b'\r\n\r\n' + jpeg + b'\r\n'
+                + b'--frame\r\nContent-Type: image/jpeg\r\n\r\n' + jpeg + b'\r\n--frame\r\n')
+
+        reader = MultipartJPEGReader(io.BufferedReader(io.BytesIO(body), buffer_size=100), '--frame')
+        self.assertEqual(reader.read(), jpeg)
+        self.assertEqual(reader.read(), jpeg)
+        with self.assertRaises(EOFError):
+            reader.read()
+
+        self.assertEqual(decode_jpeg(jpeg, scale=2).shape, (32, 48, 3))
+
+def _stub_detector(gray, upsample):
+    """Face detector stand-in reporting one face at a fixed position."""
+    return [Mock(**{'left.return_value': 10, 'top.return_value': 20,
+                    'right.return_value': 50, 'bottom.return_value': 60})]
+
+
+def _stub_predictor(gray, rect):
+    """Landmark stand-in; points along a line give an eye aspect ratio of 1."""
+    return Mock(num_parts=68, part=lambda i: Mock(x=i, y=0))
+
+
+def _stub_models():
+    """Model loader for spawned inference workers; emotions reflect the received pixels."""
+    emotions = Mock()
+    emotions.classify.side_effect = lambda frame, box: {'happy': float(frame[0, 0, 0]) / 255}
+    return emotions, _stub_detector, _stub_predictor
+
+
+class TestProcessBackend(unittest.TestCase):
+    """Test inference in spawned worker processes."""
+
+    def test_shared_memory_round_trip_and_shutdown(self):
+        """Test that a frame reaches the worker through shared memory and shutdown cleans up."""
+        from multiprocessing import shared_memory
+        from process_backend import ProcessInferenceBackend
+
+        backend = ProcessInferenceBackend(1, model_loader=_stub_models)
+        try:
+            frame = np.full((120, 160, 3), 51, dtype=np.uint8)
+            analysis = backend.analyze('cam', frame)
+            names = [buffer.name for buffer in backend._buffers.values()]
+        finally:
+            backend.close()
+
+        self.assertEqual(analysis.box, (10, 20, 40, 40))
+        self.assertEqual(analysis.emotions, {'happy': 0.2})
+        self.assertAlmostEqual(analysis.ear, 1.0)
+        process = backend.workers[0].process
+        self.assertFalse(process.is_alive())
+        self.assertEqual(process.exitcode, 0)
+        self.assertEqual(len(names), 1)
+        with self.assertRaises(FileNotFoundError):
+            shared_memory.SharedMemory(name=names[0])
+
+    def test_dead_worker_is_restarted(self):
+        """Test that a killed worker is replaced and its streams keep being analysed."""
+        from process_backend import ProcessInferenceBackend
+
+        backend = ProcessInferenceBackend(1, model_loader=_stub_models)
+        self.addCleanup(backend.close)
+        frame = np.full((120, 160, 3), 51, dtype=np.uint8)
+        backend.analyze('cam', frame)
+
+        killed = backend.workers[0].process
+        killed.kill()
+        killed.join()
+
+        self.assertEqual(backend.analyze('cam', frame).emotions, {'happy': 0.2})
+        self.assertIsNot(backend.workers[0].process, killed)
+        self.assertEqual(backend.workers[0].restarts, 1)
+
+class TestFleet(unittest.TestCase):
+    """Test fleet stream parsing and the shared inference pool."""
+
+    def test_parse_fleet_streams(self):
+        """Test parsing of the FLEET_STREAMS setting."""
+        from fleet import parse_fleet_streams
+
+        streams = parse_fleet_streams('car1=http://car1:8080/stream.mjpg, car2=0,broken')
+        self.assertEqual(streams, [('car1', 'http://car1:8080/stream.mjpg'), ('car2', '0')])
+        self.assertEqual(parse_fleet_streams(''), [])
+
+    def test_pool_processes_newest_frame(self):
+        """Test that pooled workers analyse the newest frame of each stream."""
+        import threading
+        from capture import LatestFrameSlot
+        from fleet import InferencePool
+
+        done = threading.Event()
+        handler = Mock(stream_id='car1', running=True)
+        handler.frame_slot = LatestFrameSlot()
+        handler.handle_frame.side_effect = lambda frame, captured_at: done.set()
+
+        pool = InferencePool(workers=2)
+        pool.attach(handler)
+        pool.start()
+        try:
+            handler.frame_slot.put(np.zeros((2, 2, 3), dtype=np.uint8))
+            self.assertTrue(done.wait(timeout=2))
+        finally:
+            pool.stop()
+        handler.handle_frame.assert_called_once()
+
+class TestApi(unittest.TestCase):
+    """Test API endpoints with the Flask test client."""
+
+    @classmethod
+    def setUpClass(cls):
+        with patch.object(Config, 'PRELOAD_MODELS', False):
+            import app as app_module
+        cls.app_module = app_module
+        cls.client = app_module.app.test_client()
+
+    def setUp(self):
+        from frame_cache import FrameCache
+
+        self.handler = self.app_module.video_handler
+        self.handler.frame_cache = FrameCache()
+        self.addCleanup(setattr, self.handler, 'running', False)
+
+    def test_video_sends_cached_jpeg_bytes(self):
+        """Test that MJPEG parts carry the cached JPEG with its real length."""
+        self.handler.running = True
+        self.handler.frame_cache.publish_jpeg(b'\xff\xd8jpeg\xff\xd9')
+
+        response = self.client.get('/api/video', buffered=False)
+        chunks = iter(response.response)
+        header, payload = next(chunks), next(chunks)
+        response.close()
+
+        self.assertIn(b'Content-Length: 8\r\n', header)
+        self.assertEqual(payload, b'\xff\xd8jpeg\xff\xd9')
+
+    def test_status_change_notifies_listeners(self):
+        """Test that analysis results reach status listeners, also for passthrough frames."""
+        listener = Mock()
+        patcher = patch.object(self.handler, 'status_listeners', [listener])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        with patch.object(self.handler, 'detect_emotion_and_sleep', return_value=('fear', 'Awake', 0.1)):
+            self.handler.process_frame(np.zeros((4, 4, 3), dtype=np.uint8))
+            self.handler.process_frame(np.zeros((4, 4, 3), dtype=np.uint8))
+        listener.assert_called_once_with()
+
+    def test_websocket_sends_status_and_frames(self):
+        """Test that the WebSocket pushes status as JSON text and frames as binary."""
+        if self.app_module.Sock is None:
+            self.skipTest('flask-sock is not installed')
+        import json
+        import threading
+
+        import simple_websocket
+        from werkzeug.serving import make_server
+
+        server = make_server('127.0.0.1', 0, self.app_module.app, threaded=True)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        self.addCleanup(thread.join, 5)
+        self.addCleanup(server.shutdown)
+
+        self.handler.running = True
+        seq = self.client.get('/api/status').get_json()['seq']
+        self.handler.frame_cache.publish_jpeg(b'\xff\xd8first\xff\xd9')
+
+        ws = simple_websocket.Client.connect(f'ws://127.0.0.1:{server.server_port}/api/ws')
+        try:
+            self.assertEqual(json.loads(ws.receive(timeout=5))['seq'], seq)
+            self.assertEqual(ws.receive(timeout=5), b'\xff\xd8first\xff\xd9')
+
+            with patch.object(self.handler, 'detect_emotion_and_sleep', return_value=('surprise', 'Awake', 0.3)):
+                self.handler.process_frame(np.zeros((4, 4, 3), dtype=np.uint8))
+            self.handler.frame_cache.publish_jpeg(b'\xff\xd8second\xff\xd9')
+
+            status = json.loads(ws.receive(timeout=5))
+            self.assertEqual(status['seq'], seq + 1)
+            self.assertEqual(status['emotion'], 'surprise')
+            self.assertEqual(ws.receive(timeout=5), b'\xff\xd8second\xff\xd9')
+        finally:
+            ws.close()
+            self.handler.running = False
+
+    def test_roi_is_validated_against_the_frame(self):
+        """Test that negative ROIs are rejected and oversized ones are clamped to the frame."""
+        from roi import DriverROI
+
+        patcher = patch.multiple(self.handler, roi=DriverROI(), frame=np.zeros((480, 640, 3), dtype=np.uint8))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        response = self.client.post('/api/roi', json={'x': -5, 'y': 10, 'w': 100, 'h': 100})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post('/api/roi', json={'x': 700, 'y': 10, 'w': 100, 'h': 100})
+        self.assertEqual(response.status_code, 400)
+        self.assertIsNone(self.handler.roi.region)
+
+        response = self.client.post('/api/roi', json={'x': 600, 'y': 400, 'w': 100, 'h': 100})
+        self.assertEqual(response.get_json()['region'], [600, 400, 40, 80])
+        self.assertEqual(self.handler.roi.region, (600, 400, 40, 80))
+
+    def test_status_long_poll_and_events(self):
+        """Test that status carries a sequence and changes are pushed."""
+        self.handler.running = True
+        seq = self.client.get('/api/status').get_json()['seq']
+
+        with patch.object(self.handler, 'detect_emotion_and_sleep', return_value=('sad', 'Awake', 0.4)):
+            self.handler.process_frame(np.zeros((4, 4, 3), dtype=np.uint8))
+
+        status = self.client.get(f'/api/status?since={seq}&timeout=0').get_json()
+        self.assertEqual(status['seq'], seq + 1)
+        self.assertEqual(status['emotion'], 'sad')
+
+        boot = self.app_module.BOOT_ID
+        response = self.client.get('/api/status/stream', headers={'Last-Event-ID': f'{boot}-{seq}'}, buffered=False)
+        event = next(iter(response.response))
+        response.close()
+        self.assertTrue(event.startswith(f'id: {boot}-{seq + 1}\ndata: '.encode()))
+
+    def test_event_id_from_another_boot_gets_current_status(self):
+        """Test that a reconnecting EventSource with an id from before a restart is not stalled."""
+        self.handler.running = True
+        seq = self.client.get('/api/status').get_json()['seq']
+
+        started = time.time()
+        response = self.client.get('/api/status/stream', headers={'Last-Event-ID': f'0123abcd-{seq + 100}'},
+                                   buffered=False)
+        event = next(iter(response.response))
+        response.close()
+        self.assertLess(time.time() - started, 2)
+        self.assertTrue(event.startswith(f'id: {self.app_module.BOOT_ID}-{seq}\ndata: '.encode()))
+
+    def test_long_poll_from_before_a_restart_answers_at_once(self):
+        """Test that a since token from another boot or ahead of the counter does not wait."""
+        self.handler.running = True
+        current = self.client.get('/api/status').get_json()
+        self.assertEqual(current['token'], f"{self.app_module.BOOT_ID}-{current['seq']}")
+
+        started = time.time()
+        ahead = self.client.get(f"/api/status?since={current['seq'] + 100}&timeout=5").get_json()
+        other_boot = self.client.get(f"/api/status?since=0123abcd-{current['seq']}&timeout=5").get_json()
+        self.assertLess(time.time() - started, 2)
+        self.assertEqual((ahead['seq'], other_boot['seq']), (current['seq'], current['seq']))
+
+    def test_conditional_get(self):
+        """Test that unchanged frames and status are answered with 304."""
+        self.handler.frame_cache.publish_jpeg(b'jpeg')
+
+        etags = {}
+        for url in ('/api/frame', '/api/status'):
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, 200)
+            etags[url] = first.headers['ETag']
+
+            cached = self.client.get(url, headers={'If-None-Match': etags[url]})
+            self.assertEqual(cached.status_code, 304)
+            self.assertEqual(cached.data, b'')
+
+        self.handler.frame_cache.publish_jpeg(b'newer')
+        changed = self.client.get('/api/frame', headers={'If-None-Match': etags['/api/frame']})
+        self.assertEqual(changed.status_code, 200)
+
+    def test_preload_only_from_entry_points(self):
+        """Test that importing app never preloads and the app factory does."""
+        import subprocess
+
+        script = "import threading, app; print(any(t.name == 'model-preload' for t in threading.enumerate()))"
+        result = subprocess.run(
+            [sys.executable, '-c', script], capture_output=True, text=True, timeout=60,
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+            env=dict(os.environ, PRELOAD_MODELS='True')
+        )
+        self.assertEqual(result.stdout.strip().splitlines()[-1], 'False')
+
+        with patch.object(self.app_module, 'start_preload') as start_preload, \
+                patch.object(Config, 'PRELOAD_MODELS', True):
+            self.assertIs(self.app_module.create_app(), self.app_module.app)
+            with patch.object(Config, 'FRAME_BUS_ROLE', 'reader'):
+                self.app_module.create_app()
+        start_preload.assert_called_once()
+
+    def test_ready_before_preload(self):
+        """Test that readiness is reported as unavailable before models load."""
+        response = self.client.get('/api/ready')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json()['state'], 'idle')
+
+    def test_ready_after_lazy_load(self):
+        """Test that models loaded on demand by /api/start make the server ready."""
+        models = (Mock(), Mock(), Mock())
+        with patch.dict(self.app_module.readiness), \
+                patch.object(self.app_module, '_models', None), \
+                patch.object(self.app_module, 'load_models', return_value=models):
+            self.assertIs(self.app_module.get_models(), models)
+            response = self.client.get('/api/ready')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['state'], 'ready')
+
+    def test_reader_ready_once_bus_attached(self):
+        """Test that frame bus readers report ready once attached, without loading models."""
+        with patch.object(Config, 'FRAME_BUS_ROLE', 'reader'), \
+                patch.object(self.handler, 'bus_attached', False):
+            response = self.client.get('/api/ready')
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.get_json()['state'], 'waiting_for_publisher')
+
+            self.handler.bus_attached = True
+            response = self.client.get('/api/ready')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.get_json()['state'], 'ready')
+
+class TestAsyncServer(unittest.IsolatedAsyncioTestCase):
+    """Test the asynchronous broadcaster server."""
+
+    async def start_server(self, status_seq=0, **server_options):
+        """Serve one stream 'car1' from an AsyncServer, bridging other routes to the Flask app."""
+        import threading
+        from types import SimpleNamespace
+        from aiohttp.test_utils import TestClient, TestServer
+        from frame_cache import FrameCache
+
+        with patch.object(Config, 'PRELOAD_MODELS', False):
+            from async_server import AsyncServer
+            import app as app_module
+
+        handler = SimpleNamespace(
+            running=True, frame_cache=FrameCache(), status_lock=threading.Lock(),
+            status_seq=status_seq, status_epoch='boot', status_data={'emotion': 'neutral'}, status_listeners=[]
+        )
+        server = AsyncServer({'car1': handler}, app_module.app, **server_options)
+        client = TestClient(TestServer(server.make_app()))
+        await client.start_server()
+        self.addAsyncCleanup(client.close)
+        return handler, server, client
+
+    async def test_frames_fan_out_to_all_viewers(self):
+        """Test that one published frame reaches every viewer and other routes reach Flask."""
+        import threading
+
+        handler, server, client = await self.start_server()
+
+        viewers = [await client.get('/api/streams/car1/video') for _ in range(2)]
+        self.assertEqual(server.broadcasters['car1'].stats()['subscribers'], 2)
+
+        threading.Thread(target=handler.frame_cache.publish_jpeg, args=(b'\xff\xd8jpeg\xff\xd9',)).start()
+        for viewer in viewers:
+            part = await viewer.content.readuntil(b'\xff\xd9')
+            self.assertTrue(part.startswith(b'--frame\r\n'))
+            self.assertIn(b'Content-Length: 8\r\n', part)
+            viewer.close()
+
+        self.assertEqual((await client.get('/api/streams/unknown/video')).status, 404)
+        self.assertEqual((await client.get('/api/ready')).status, 503)
+
+    async def test_status_only_change_is_pushed(self):
+        """Test that a status change without a new frame reaches SSE subscribers."""
+        import threading
+
+        handler, _, client = await self.start_server()
+
+        events = await client.get('/api/streams/car1/status/stream')
+
+        def lose_source():
+            with handler.status_lock:
+                handler.status_seq, handler.status_data = 1, {'emotion': 'neutral', 'stale': True}
+            for listener in handler.status_listeners:
+                listener()
+
+        threading.Thread(target=lose_source).start()
+        event = await asyncio.wait_for(events.content.readuntil(b'\n\n'), 5)
+        events.close()
+        self.assertIn(b'"stale": true', event)
+
+    async def test_long_poll_is_native_and_bridge_passes_requests(self):
+        """Test that status long-polls wait on the broadcaster and other routes reach Flask."""
+        import threading
+
+        handler, _, client = await self.start_server(wsgi_threads=1)
+
+        def change_status():
+            with handler.status_lock:
+                handler.status_seq, handler.status_data = 1, {'emotion': 'sad'}
+            handler.frame_cache.publish_jpeg(b'jpeg')
+
+        poll = asyncio.ensure_future(client.get('/api/streams/car1/status?since=0&timeout=5'))
+        # Bridged requests keep being served while the long-poll waits
+        self.assertEqual((await client.get('/api/ready')).status, 503)
+        threading.Thread(target=change_status).start()
+        response = await asyncio.wait_for(poll, 5)
+        self.assertEqual(await response.json(), {'emotion': 'sad', 'seq': 1, 'token': 'boot-1'})
+
+        cached = await client.get('/api/streams/car1/status', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(cached.status, 304)
+
+        posted = await client.post('/api/roi', json={'x': 1, 'y': 1, 'w': 10, 'h': 10})
+        self.assertEqual(posted.status, 404)
+        self.assertEqual((await posted.json())['error'], 'Driver ROI is disabled')
+
+    async def test_event_id_from_another_boot_gets_current_status(self):
+        """Test that the async event stream ignores a Last-Event-ID from an earlier boot."""
+        _, _, client = await self.start_server(status_seq=3)
+
+        events = await client.get('/api/streams/car1/status/stream', headers={'Last-Event-ID': 'earlier-99'})
+        event = await asyncio.wait_for(events.content.readuntil(b'\n\n'), 2)
+        events.close()
+        self.assertTrue(event.startswith(b'id: boot-3\ndata: '))
+
+    async def test_reader_pushes_a_dead_publisher_as_stale(self):
+        """Test that a reader worker's subscribers learn of a dead publisher without a new frame."""
+        import threading
+        from types import SimpleNamespace
+        from frame_bus import FrameBusWriter, mirror_from_bus
+        from frame_cache import EncodedFrame, FrameCache
+
+        with patch.object(Config, 'PRELOAD_MODELS', False):
+            from async_server import StreamBroadcaster
+
+        tracker = patch('frame_bus.resource_tracker')
+        tracker.start()
+        self.addCleanup(tracker.stop)
+
+        prefix = f"safedrive_stale_{os.getpid()}"
+        writer = FrameBusWriter(prefix, 'car1', 64 * 1024)
+        self.addCleanup(writer.shm.close)
+        writer.start_heartbeat(0.02)
+        writer.publish(EncodedFrame(1, b'live', 1.0), 1, {'emotion': 'neutral'})
+
+        lock = threading.Lock()
+        handler = SimpleNamespace(
+            stream_id='car1', frame_cache=FrameCache(), status_lock=lock, status_changed=threading.Condition(lock),
+            status_seq=0, status_epoch='boot', status_data={}, running=False, status_listeners=[]
+        )
+        stop = threading.Event()
+        self.addCleanup(stop.set)
+        mirror_from_bus(handler, prefix, 0.01, heartbeat_timeout=0.5, stop=stop)
+        for _ in range(500):
+            if handler.status_data == {'emotion': 'neutral'} and handler.frame_cache.latest() is not None:
+                break
+            await asyncio.sleep(0.01)
+
+        subscriber = StreamBroadcaster(handler, asyncio.get_running_loop()).subscribe()
+        await subscriber.get(timeout=1)
+
+        # The heartbeat stops and no further frame is published
+        writer._closed.set()
+        writer._heartbeat_thread.join()
+        _, status = await subscriber.get(timeout=5)
+        self.assertTrue(status[2]['stale'])
+        self.assertEqual(status[0], f"{writer.generation:x}-down")
+
 class TestIntegration(unittest.TestCase):
     """Integration tests for the application."""
 
@@ -91,10 +1254,26 @@ class TestIntegration(unittest.TestCase):
         mock_cap_instance.isOpened.return_value = True
         mock_cap.return_value = mock_cap_instance
 
-        cap = secure_camera_capture(0, 1)
+        with patch('utils.sys.platform', 'win32'):
+            cap = secure_camera_capture(0, 1)
         self.assertIsNotNone(cap)
         mock_cap.assert_called_with(0, cv2.CAP_DSHOW)
 
+    @patch('cv2.VideoCapture')
+    def test_low_latency_camera_settings(self, mock_cap):
+        """Test that Linux uses V4L2 and requested capture settings are applied."""
+        from utils import secure_camera_capture
+
+        mock_cap.return_value.isOpened.return_value = True
+        mock_cap.return_value.get.return_value = 0
+
+        with patch('utils.sys.platform', 'linux'):
+            cap = secure_camera_capture(0, 1, width=640, height=480, fps=30, buffer_size=1)
+        mock_cap.assert_called_with(0, cv2.CAP_V4L2)
+        cap.set.assert_any_call(cv2.CAP_PROP_FRAME_WIDTH, 640)
+        cap.set.assert_any_call(cv2.CAP_PROP_BUFFERSIZE, 1)
+        self.assertEqual(cap.set.call_count, 4)
+
 if __name__ == '__main__':
     # Create test directory if it doesn't exist
     os.makedirs('tests', exist_ok=True)
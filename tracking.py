@@ -0,0 +1,81 @@
+"""
+Face tracking between full detections.
+
+A driver stays in the same seat for hours, so running the HOG detector on
+every frame is mostly wasted work. The tracker runs the detector every N
+frames, or sooner when the correlation tracker's confidence drops, and
+follows the face box with dlib's correlation tracker in between.
+"""
+
+from typing import Callable, Optional
+
+import numpy as np
+
+
+def _default_tracker_factory():
+    import dlib
+    return dlib.correlation_tracker()
+
+
+def _to_rectangle(position):
+    import dlib
+    return dlib.rectangle(
+        int(round(position.left())), int(round(position.top())),
+        int(round(position.right())), int(round(position.bottom()))
+    )
+
+
+class FaceTracker:
+    """Follows the primary face and decides when a full detection is needed."""
+
+    def __init__(self, detection_interval: int = 10, min_confidence: float = 7.0,
+                 tracker_factory: Optional[Callable] = None,
+                 to_rectangle: Optional[Callable] = None):
+        """
+        Args:
+            detection_interval: Run the full detector at least every N frames
+            min_confidence: Peak-to-sidelobe ratio below which the track is dropped
+            tracker_factory: Creates correlation trackers (defaults to dlib)
+            to_rectangle: Converts a tracker position to a detector rectangle
+        """
+        self.detection_interval = max(detection_interval, 1)
+        self.min_confidence = min_confidence
+        self.tracker_factory = tracker_factory or _default_tracker_factory
+        self.to_rectangle = to_rectangle or _to_rectangle
+        self.tracker = None
+        self.frames_since_detection = 0
+        self.detections = 0
+        self.tracked = 0
+
+    def reset(self):
+        """Drop the current track so the next frame runs a full detection."""
+        self.tracker = None
+
+    def locate(self, gray: np.ndarray, detect: Callable):
+        """
+        Locate the face, running the full detector only when needed.
+
+        Args:
+            gray: Grayscale frame
+            detect: Full detector, called as detect(gray) and returning a rectangle or None
+
+        Returns:
+            Rectangle of the face, or None if no face was found
+        """
+        if self.tracker is not None and self.frames_since_detection < self.detection_interval:
+            confidence = self.tracker.update(gray)
+            if confidence >= self.min_confidence:
+                self.frames_since_detection += 1
+                self.tracked += 1
+                return self.to_rectangle(self.tracker.get_position())
+
+        rect = detect(gray)
+        self.detections += 1
+        self.frames_since_detection = 0
+        if rect is None:
+            self.tracker = None
+            return None
+
+        self.tracker = self.tracker_factory()
+        self.tracker.start_track(gray, rect)
+        return rect
@@ -1,27 +1,87 @@
+import sys
 import cv2
 import numpy as np
 from typing import Tuple, Optional
 from logger import logger
-import dlib
 from imutils import face_utils
 from scipy.spatial import distance as dist
 
-def secure_camera_capture(camera_index: int = 0, fallback_index: int = 1) -> Optional[cv2.VideoCapture]:
+# Capture backends selectable with CAMERA_BACKEND
+CAMERA_BACKENDS = {
+    'any': cv2.CAP_ANY,
+    'dshow': cv2.CAP_DSHOW,
+    'msmf': cv2.CAP_MSMF,
+    'v4l2': cv2.CAP_V4L2,
+    'avfoundation': cv2.CAP_AVFOUNDATION,
+}
+
+def camera_backend(name: str = 'auto') -> int:
+    """
+    Resolve the OpenCV capture backend for local cameras.
+
+    Args:
+        name: Backend name from CAMERA_BACKENDS, or "auto" for the platform default
+
+    Returns:
+        OpenCV CAP_* constant
+    """
+    if name in CAMERA_BACKENDS:
+        return CAMERA_BACKENDS[name]
+    if sys.platform.startswith('win'):
+        return cv2.CAP_DSHOW  # DirectShow for better compatibility on Windows
+    if sys.platform.startswith('linux'):
+        return cv2.CAP_V4L2
+    if sys.platform == 'darwin':
+        return cv2.CAP_AVFOUNDATION
+    return cv2.CAP_ANY
+
+def configure_camera(cap: cv2.VideoCapture, width: int = 0, height: int = 0, fps: float = 0,
+                     buffer_size: int = 0):
+    """
+    Request capture properties; zero leaves a property at the driver default.
+
+    Args:
+        cap: Opened VideoCapture
+        width: Frame width in pixels
+        height: Frame height in pixels
+        fps: Frame rate
+        buffer_size: Number of frames the driver queues; 1 keeps reads current
+    """
+    for prop, value in ((cv2.CAP_PROP_FRAME_WIDTH, width), (cv2.CAP_PROP_FRAME_HEIGHT, height),
+                        (cv2.CAP_PROP_FPS, fps), (cv2.CAP_PROP_BUFFERSIZE, buffer_size)):
+        if value:
+            cap.set(prop, value)
+    logger.info(
+        f"Camera settings: {cap.get(cv2.CAP_PROP_FRAME_WIDTH)}x{cap.get(cv2.CAP_PROP_FRAME_HEIGHT)}"
+        f" @ {cap.get(cv2.CAP_PROP_FPS)} fps"
+    )
+
+def secure_camera_capture(camera_index: int = 0, fallback_index: int = 1, backend: Optional[int] = None,
+                          width: int = 0, height: int = 0, fps: float = 0,
+                          buffer_size: int = 0) -> Optional[cv2.VideoCapture]:
     """
     Securely initialize camera capture with fallback options.
 
     Args:
         camera_index: Primary camera index
         fallback_index: Fallback camera index
+        backend: OpenCV capture backend, defaults to the platform's native one
+        width: Requested frame width, 0 for the driver default
+        height: Requested frame height, 0 for the driver default
+        fps: Requested frame rate, 0 for the driver default
+        buffer_size: Driver frame queue length, 0 for the driver default
 
     Returns:
         VideoCapture object or None if failed
     """
+    if backend is None:
+        backend = camera_backend()
     for index in [camera_index, fallback_index]:
         try:
-            cap = cv2.VideoCapture(index, cv2.CAP_DSHOW)  # Use DirectShow on Windows for better compatibility
+            cap = cv2.VideoCapture(index, backend)
             if cap.isOpened():
                 logger.info(f"Camera initialized successfully on index {index}")
+                configure_camera(cap, width, height, fps, buffer_size)
                 return cap
             else:
                 cap.release()
@@ -126,27 +186,72 @@ def eye_aspect_ratio(eye):
 
     return ear
 
-def detect_eye_closure(frame: np.ndarray, detector, predictor, ear_thresh: float = 0.25) -> bool:
+def rect_to_box(rect, frame_shape: Tuple[int, ...]) -> Tuple[int, int, int, int]:
     """
-    Detect if eyes are closed based on eye aspect ratio.
+    Convert a dlib rectangle to an (x, y, w, h) box clamped to the frame.
 
     Args:
-        frame: Input frame
-        detector: dlib face detector
-        predictor: dlib shape predictor
-        ear_thresh: Threshold for eye aspect ratio to consider eyes closed
+        rect: dlib rectangle
+        frame_shape: Shape of the frame the rectangle refers to
 
     Returns:
-        True if eyes are closed, False otherwise
+        Box as (x, y, width, height)
     """
-    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-    rects = detector(gray, 0)
+    height, width = frame_shape[:2]
+    left = max(rect.left(), 0)
+    top = max(rect.top(), 0)
+    right = min(rect.right(), width - 1)
+    bottom = min(rect.bottom(), height - 1)
+    return left, top, max(right - left, 0), max(bottom - top, 0)
+
+def scale_rect(rect, factor: float):
+    """
+    Scale a dlib rectangle, e.g. to map a detection on a resized frame back.
 
-    if len(rects) == 0:
-        return False  # No face detected, assume eyes open
+    Args:
+        rect: dlib rectangle
+        factor: Multiplier applied to every coordinate
+
+    Returns:
+        Scaled dlib rectangle
+    """
+    import dlib  # deferred so importing utils does not load dlib
+
+    return dlib.rectangle(
+        int(round(rect.left() * factor)), int(round(rect.top() * factor)),
+        int(round(rect.right() * factor)), int(round(rect.bottom() * factor))
+    )
+
+def translate_rect(rect, dx: int, dy: int):
+    """
+    Shift a dlib rectangle, e.g. to map a detection in a crop back to the frame.
+
+    Args:
+        rect: dlib rectangle
+        dx: Horizontal offset
+        dy: Vertical offset
 
+    Returns:
+        Shifted dlib rectangle
+    """
+    import dlib  # deferred so importing utils does not load dlib
+
+    return dlib.rectangle(rect.left() + dx, rect.top() + dy, rect.right() + dx, rect.bottom() + dy)
+
+def calculate_ear(gray: np.ndarray, rect, predictor) -> float:
+    """
+    Calculate the average eye aspect ratio for an already detected face.
+
+    Args:
+        gray: Grayscale frame
+        rect: dlib rectangle of the face
+        predictor: dlib shape predictor
+
+    Returns:
+        Average eye aspect ratio of both eyes
+    """
     # Get facial landmarks
-    shape = predictor(gray, rects[0])
+    shape = predictor(gray, rect)
     shape = face_utils.shape_to_np(shape)
 
     # Extract left and right eye coordinates
@@ -161,7 +266,28 @@ def detect_eye_closure(frame: np.ndarray, detector, predictor, ear_thresh: float
     rightEAR = eye_aspect_ratio(rightEye)
 
     # Average the eye aspect ratio
-    ear = (leftEAR + rightEAR) / 2.0
+    return (leftEAR + rightEAR) / 2.0
+
+def detect_eye_closure(frame: np.ndarray, detector, predictor, ear_thresh: float = 0.25) -> bool:
+    """
+    Detect if eyes are closed based on eye aspect ratio.
+
+    Args:
+        frame: Input frame
+        detector: dlib face detector
+        predictor: dlib shape predictor
+        ear_thresh: Threshold for eye aspect ratio to consider eyes closed
+
+    Returns:
+        True if eyes are closed, False otherwise
+    """
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    rects = detector(gray, 0)
+
+    if len(rects) == 0:
+        return False  # No face detected, assume eyes open
+
+    ear = calculate_ear(gray, rects[0], predictor)
 
     # Return True if eyes are closed (EAR below threshold)
     return ear < ear_thresh